@@ -0,0 +1,897 @@
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import random
+import argparse
+import requests
+import tempfile
+import platform
+import contextlib
+import statistics
+import numpy as np
+import pandas as pd
+from types import SimpleNamespace
+from datetime import datetime
+from backtesting import Backtest
+from concurrent.futures import ProcessPoolExecutor
+
+from DataManagement import BinanceKlineFetcher, NewsScraper, StockScraper, lttbIndices
+from Indicators import (AtrState, BbandsState, EmaState, EwmMacdState, EwmState, MacdState, ObvState, RollingMaxState,
+                        RollingMinState, RollingRsiState, RsiState, SmaState, StochState, atrSeries, bbandsSeries,
+                        emaSeries, macdSeries, obvSeries, rollingMaxSeries, rollingMinSeries, rsiSeries, smaSeries,
+                        stochSeries)
+import Prediction
+from Prediction import PREDICTORS, SarimaxPredictor
+import Strategies
+from Strategies import STRATEGIES, STRATEGY_OPTIMIZATION, INDICATOR_FAMILIES
+from Streaming import BarRingBuffer, ReplayKlineServer
+from VectorBacktest import VectorBacktest
+
+
+def timeCall(fn, repeat = 5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {
+        "repeat": repeat,
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "mean_s": statistics.fmean(timings)
+    }
+
+def writeResults(results, output, config = None):
+    payload = {
+        "created": datetime.now().isoformat(timespec = "seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config or {},
+        "results": results
+    }
+    with open(output, "w") as file:
+        json.dump(payload, file, indent = 2)
+
+def printResults(results, columns):
+    print("  ".join(f"{column:>14}" for column in columns))
+    for result in results:
+        cells = []
+        for column in columns:
+            value = result.get(column, "")
+            cells.append(f"{value:>14.6g}" if isinstance(value, float) else f"{str(value):>14}")
+        print("  ".join(cells))
+
+
+########  News Parsers  ########
+
+def recordNewsFixtures(fixtures_dir):
+    # Saves the current html of every NEWS_URLS page as a fixture, index.json maps file names back to urls
+    os.makedirs(fixtures_dir, exist_ok = True)
+    index = {}
+
+    async def record():
+        try:
+            for news_type in NewsScraper.NEWS_URLS:
+                scraper = NewsScraper(news_type = news_type)
+                await scraper.scrapePagesAsync()
+                for html, link in zip(scraper.htmls, scraper.links):
+                    name = re.sub(r"[^A-Za-z0-9]+", "_", link).strip("_") + ".html"
+                    with open(os.path.join(fixtures_dir, name), "w", encoding = "utf-8") as file:
+                        file.write(html)
+                    index[name] = link
+        finally:
+            await NewsScraper.BROWSER_POOL.close()
+
+    asyncio.run(record())
+    with open(os.path.join(fixtures_dir, "index.json"), "w") as file:
+        json.dump(index, file, indent = 2)
+    return index
+
+def loadNewsFixtures(fixtures_dir):
+    with open(os.path.join(fixtures_dir, "index.json")) as file:
+        index = json.load(file)
+    fixtures = []
+    for name, link in sorted(index.items()):
+        with open(os.path.join(fixtures_dir, name), encoding = "utf-8") as file:
+            fixtures.append((name, link, file.read()))
+    return fixtures
+
+NEWS_WORDS = ("markets", "Sensex", "Nifty", "rupee", "crude", "rally", "slump", "RBI", "Fed", "inflation", "earnings",
+              "quarter", "profit", "revenue", "shares", "investors", "bond", "yields", "policy", "growth", "IPO",
+              "listing", "gold", "bitcoin", "exports", "tariff", "banks", "IT", "auto", "pharma", "steel", "outlook",
+              "guidance", "dividend", "buyback", "merger", "stake", "FII", "DII", "volatility", "margin", "demand")
+
+def syntheticNewsPages(seed = 0):
+    # Generated listing pages, one per source, with each site's item markup (the parsers' selectors plus look-alike
+    # classes, nested tags, entities and ragged whitespace) at roughly the live pages' item count and weight:
+    # script and style blobs, mega menus, sidebars and footers around the listing. Not recorded pages, they only
+    # stand in for them where the live sites cannot be reached
+    rng = random.Random(seed)
+
+    def words(count):
+        return " ".join(rng.choice(NEWS_WORDS) for _ in range(count))
+
+    def headline():
+        return (f"{words(rng.randint(5, 11)).capitalize()} {rng.choice(['&amp; ', '&#8377;', '', '&ndash; '])}"
+                f"{rng.randint(1, 999)}{rng.choice(['%', ' cr', ' bn', ''])}")
+
+    def text():
+        ending = rng.choice([".", ". ", "&hellip;", ".&nbsp;", ".\n   "])
+        return f"{words(rng.randint(12, 30)).capitalize()}, <b>{words(2)}</b> {words(rng.randint(4, 12))}{ending}"
+
+    def slug():
+        return "-".join(words(rng.randint(4, 8)).lower().split()) + f"-{rng.randint(10 ** 6, 10 ** 7)}"
+
+    def page(site, body, links, script_kb):
+        submenu = lambda i: "".join(f'<li><a href="/{site}/{i}/{j}">{words(1)}</a></li>' for j in range(4))
+        menu = "".join(f'<li class="menu-item clearfix-menu"><a href="/{site}/section-{i}">{words(2)}</a>'
+                       f'<ul class="sub">{submenu(i)}</ul></li>' for i in range(links // 5))
+        scripts = "".join(f'<script>window.__DATA_{i}__ = {json.dumps([words(8) for _ in range(200)])};</script>'
+                          for i in range(script_kb * 1024 // 12_000))
+        styles = "".join(f".c{i}{{margin:{i}px;padding:{i % 7}px}}" for i in range(1500))
+        footer = "".join(f'<a href="/{site}/footer-{i}" class="footer-link">{words(2)}</a>' for i in range(links // 2))
+        sidebar = "".join(f'<div class="trending-item"><a href="/trending/{slug()}">{headline()}</a></div>'
+                          for _ in range(20))
+        return (f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>{words(4)}</title>'
+                f'<style>{styles}</style>{scripts}</head><body><header><nav class="mega-menu"><ul>{menu}</ul></nav>'
+                f'</header>{body}<aside class="sidebar">{sidebar}</aside><footer><div class="footer-links">{footer}'
+                f'</div><p>&copy; {site}</p></footer></body></html>')
+
+    def zerodhaItem(i):
+        similar = "".join(f'<li class="box item-similar"><a href="https://example.in/{slug()}">{headline()}</a></li>'
+                          for _ in range(rng.randint(1, 4)))
+        publisher = rng.choice(["www.livemint.com", "economictimes.indiatimes.com", "www.business-standard.com"])
+        return (f'<li class="box item" id="item-{i}"><h2 class="title"><a href="https://{publisher}/{slug()}" '
+                f'target="_blank">{headline()}</a></h2><div class="desc">{text()}</div>'
+                f'<span class="date">{rng.randint(1, 59)} minutes ago</span> &ndash; <span class="feed">{words(1)}'
+                f'</span>{f"<ul class=similar>{similar}</ul>" if rng.random() < 0.3 else ""}</li>')
+
+    def moneycontrolItem(i):
+        link = f"https://www.moneycontrol.com/news/world/{slug()}.html"
+        advert = '<li class="ad-slot"><div class="advSlotsWithoutGrayBox"></div></li>' if i % 5 == 4 else ""
+        return (f'<li class="clearfix{rng.choice(["", " hide-mobile", " list-item"])}" id="newslist-{i}">'
+                f'<a href="{link}"><img src="https://images.moneycontrol.com/{i}.jpg" alt="{words(3)}"></a>'
+                f'<span>October {rng.randint(1, 17)}, 2026 {rng.randint(1, 12)}:{rng.randint(10, 59)} PM IST</span>'
+                f'<h2><a href="{link}" title="{words(6)}">{headline()}</a></h2><p>{text()}</p></li>{advert}')
+
+    def investingItem(i):
+        link = f"https://in.investing.com/news/world-news/{slug()}"
+        return (f'<li class="list_list__item"><article data-test="article-item" class="flex py-6">'
+                f'<a data-test="article-image-link" href="{link}"><img alt="" src="https://i-invdn-com/{i}.jpg"></a>'
+                f'<div class="block w-full"><a data-test="article-title-link" class="text-inv-blue-500" '
+                f'href="{link}">{headline()}</a><p data-test="article-description" class="mt-2 text-xs">{text()}</p>'
+                f'<ul class="mt-2.5 flex"><li><span data-test="news-provider-name">{words(1)}</span></li>'
+                f'<li><time data-test="article-publish-date">{rng.randint(1, 23)} hours ago</time></li></ul></div>'
+                f'</article></li>')
+
+    def businesstodayItem(i):
+        link = f"https://www.businesstoday.in/india/story/{slug()}"
+        return (f'<div class="widget-listing{rng.choice(["", " widget-listing-alt"])}" id="story-{i}">'
+                f'<div class="widget-listing-thumb"><a href="{link}"><img src="https://akm-img/{i}.jpg" alt=""></a>'
+                f'</div><div class="widget-listing-content-section"><h2><a href="{link}" title="{words(5)}">'
+                f'{headline()}</a></h2><p>{text()}</p><span class="date">Updated Oct {rng.randint(1, 17)}, 2026'
+                f'</span></div></div>')
+
+    listing = lambda item, count: "".join(item(i) for i in range(count))
+    pages = {
+        "https://pulse.zerodha.com/": page(
+            "pulse", f'<div id="content"><ul id="news" class="items">{listing(zerodhaItem, 300)}</ul></div>',
+            links = 100, script_kb = 40),
+        "https://www.moneycontrol.com/news/world/": page(
+            "moneycontrol", f'<div class="fleft"><ul id="cagetory">{listing(moneycontrolItem, 25)}</ul></div>',
+            links = 900, script_kb = 350),
+        "https://in.investing.com/news/world-news": page(
+            "investing", f'<div id="__next"><ul data-test="news-list">{listing(investingItem, 40)}</ul></div>',
+            links = 600, script_kb = 500),
+        "https://www.businesstoday.in/india": page(
+            "businesstoday", f'<div class="content-area"><div class="section-listing-LHS main">'
+                             f'{listing(businesstodayItem, 30)}</div><div class="section-listing-RHS">'
+                             f'<div class="widget-listing"><h2><a href="/t">{words(3)}</a></h2><p>{words(5)}</p>'
+                             f'</div></div></div>', links = 500, script_kb = 250)
+    }
+    return [("synthetic_" + re.sub(r"[^A-Za-z0-9]+", "_", link).strip("_") + ".html", link, html)
+            for link, html in pages.items()]
+
+def benchNewsParsers(fixtures, repeat = 10, workers = 0, synthetic = False):
+    # Times every parser backend on every fixture and checks that all backends produce the same items
+    results, mismatches = [], []
+    label = "synthetic" if synthetic else "recorded"
+    for name, link, html in fixtures:
+        source = NewsScraper.sourceOf(link)
+        if source is None:
+            continue
+        outputs = {}
+        for backend in NewsScraper.PARSER_BACKENDS:
+            outputs[backend] = NewsScraper.parseHtml(source, html, backend)
+            timing = timeCall(lambda: NewsScraper.parseHtml(source, html, backend), repeat)
+            results.append({"bench": "news_parser", "case": name, "source": source, "backend": backend,
+                            "fixtures": label, "kb": round(len(html.encode()) / 1024),
+                            "items": len(outputs[backend]["Titles"]), **timing})
+        reference = outputs[NewsScraper.PARSER_BACKENDS[-1]]
+        for backend, output in outputs.items():
+            if output != reference:
+                differing = [key for key in reference if output.get(key) != reference[key]]
+                mismatches.append(f"{name}: {backend} differs from {NewsScraper.PARSER_BACKENDS[-1]} in {differing}")
+    if workers and fixtures:
+        sources = [NewsScraper.sourceOf(link) for _, link, _ in fixtures]
+        htmls = [html for _, _, html in fixtures]
+        with ProcessPoolExecutor(max_workers = workers) as executor:
+            for backend in NewsScraper.PARSER_BACKENDS:
+                backends = [backend] * len(htmls)
+                list(executor.map(NewsScraper.parseHtml, sources, htmls, backends))
+                results.append({"bench": "news_parser_all", "case": "serial", "source": "all_serial",
+                                "fixtures": label, "backend": backend,
+                                **timeCall(lambda: list(map(NewsScraper.parseHtml, sources, htmls, backends)), repeat)})
+                results.append({"bench": "news_parser_all", "case": f"pool_{workers}", "source": f"all_pool_{workers}",
+                                "fixtures": label, "backend": backend,
+                                **timeCall(lambda: list(executor.map(NewsScraper.parseHtml, sources, htmls, backends)),
+                                           repeat)})
+    return results, mismatches
+
+
+########  Kline Fetcher  ########
+
+def benchKlineFetcher(bars = 20000, seed = 0, workers = (1, 8), latency = 0.02, repeat = 3):
+    # BinanceKlineFetcher against a local ReplayKlineServer: every bar of the range comes back once and in order,
+    # also for a range starting and ending inside a bar, and the 1000-bar windows are requested concurrently
+    data = syntheticOhlcv(bars, seed, freq = "min")
+    rows = ReplayKlineServer.klineRows(data, 60_000)
+    server = ReplayKlineServer({("SYNTHUSDT", "1m"): rows}, latency = latency).start()
+    results, mismatches = [], []
+    try:
+        cases = [("full", rows[0][0], rows[-1][0], rows), ("mid_bar", rows[0][0] + 30_000, rows[-1][0] - 30_000,
+                                                             rows[1:-1])]
+        for max_workers in workers:
+            fetcher = BinanceKlineFetcher(base_url = server.url, max_workers = max_workers)
+            with requests.Session() as session:
+                for case, start_ms, end_ms, expected in cases:
+                    server.requests, server.max_concurrent = [], 0
+                    klines = fetcher.getKlines("SYNTHUSDT", "1m", start_ms, end_ms, session)
+                    if klines != expected:
+                        mismatches.append(f"{case} with {max_workers} workers: {len(klines)} klines, "
+                                          f"expected {len(expected)}")
+                    results.append({"bench": "klines", "case": case, "backend": f"workers_{max_workers}",
+                                    "bars": len(expected), "requests": len(server.requests),
+                                    "concurrent": server.max_concurrent,
+                                    **timeCall(lambda: fetcher.getKlines("SYNTHUSDT", "1m", start_ms, end_ms, session),
+                                               repeat)})
+            if max_workers > 1 and bars > BinanceKlineFetcher.KLINE_LIMIT and results[-1]["concurrent"] < 2:
+                mismatches.append(f"{max_workers} workers fetched the windows one at a time")
+    finally:
+        server.stop()
+    return results, mismatches
+
+
+def ringBufferCases():
+    # (name, capacity, bars fed as (open time in minutes, close), open times in minutes the buffer must hold)
+    return [
+        ("partial", 10, [(t, t) for t in range(5)], list(range(5))),
+        ("wrapped", 10, [(t, t) for t in range(25)], list(range(15, 25))),
+        ("forming_bar", 10, [(0, 0), (1, 1), (1, 2)], [0, 1]),
+        ("gap", 10, [(t, t) for t in range(5)] + [(100, 100)], [100]),
+        ("gap_then_bars", 10, [(t, t) for t in range(7)] + [(100 + t, t) for t in range(4)], [100, 101, 102, 103]),
+        ("wrapped_gap_wrapped", 10, [(t, t) for t in range(13)] + [(100 + t, t) for t in range(12)],
+         list(range(102, 112)))
+    ]
+
+def checkBarRingBuffer():
+    # The buffer's frame after partial fills, wrap-arounds, a still forming bar and missed-bar gaps (which start the
+    # series over from the bar after the gap), against the open times it has to hold
+    mismatches = []
+    for name, capacity, bars, expected in ringBufferCases():
+        buffer = BarRingBuffer(capacity, 60_000)
+        for minute, close in bars:
+            buffer.update(minute * 60_000, close, close, close, close, 1.0)
+        frame = buffer.toFrame()
+        times = list(frame.index.asi8 // 60_000_000_000)
+        if times != expected:
+            mismatches.append(f"ring buffer {name}: holds minutes {times}, expected {expected}")
+        elif buffer.firstTime() != expected[0] * 60_000:
+            mismatches.append(f"ring buffer {name}: firstTime() {buffer.firstTime()} is not the frame's first bar")
+        elif name == "forming_bar" and frame.Close.iloc[-1] != 2:
+            mismatches.append("ring buffer forming_bar: the forming bar was not overwritten")
+    return mismatches
+
+
+########  Backtest Engines  ########
+
+def checkLttbIndices(seed = 0):
+    # Equity curve reduction on short series and small budgets: at most `points` indices, in order, always with the
+    # last point and, from 3 points on, the first point and the extremes that fit
+    rng = np.random.default_rng(seed)
+    mismatches = []
+    for length in range(7):
+        for shape, y in [("walk", rng.normal(size = length).cumsum()), ("flat", np.zeros(length)),
+                         ("peak_trough", np.sin(np.linspace(0, 2 * np.pi, length)))]:
+            for points in range(-1, 7):
+                try:
+                    keep = lttbIndices(np.arange(length), y, points)
+                except Exception as e:
+                    mismatches.append(f"lttb {shape} length {length} points {points}: {type(e).__name__} {e}")
+                    continue
+                keep = [int(index) for index in keep]
+                case = f"lttb {shape} length {length} points {points}: {keep}"
+                if len(keep) > max(points, 0) or keep != sorted(set(keep)) or any(not 0 <= index < length
+                                                                                   for index in keep):
+                    mismatches.append(f"{case} is not at most {max(points, 0)} ordered indices of the series")
+                elif points > 0 and length and keep[-1] != length - 1:
+                    mismatches.append(f"{case} drops the last point")
+                elif points >= min(3, length) and length and keep[0] != 0:
+                    mismatches.append(f"{case} drops the first point")
+                elif points >= min(4, length) and length and not {int(y.argmin()), int(y.argmax())} <= set(keep):
+                    mismatches.append(f"{case} drops an extreme")
+    return mismatches
+
+def syntheticOhlcv(bars = 2000, seed = 0, freq = "D"):
+    # Random walk candles, enough to drive every strategy through entries, exits, stop losses and take profits
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, bars)))
+    open = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, 0.003, bars))
+    high = np.maximum(open, close) * (1 + np.abs(rng.normal(0, 0.006, bars)))
+    low = np.minimum(open, close) * (1 - np.abs(rng.normal(0, 0.006, bars)))
+    volume = rng.integers(1_000, 100_000, bars).astype(float)
+    index = pd.date_range("2018-01-01", periods = bars, freq = freq, name = "Date")
+    return pd.DataFrame({"Open": open, "High": high, "Low": low, "Close": close, "Volume": volume}, index = index)
+
+def sampleParams(s_name, samples, seed = 0):
+    # Strategy defaults plus `samples` random combinations from its optimization grid
+    rng = random.Random(seed)
+    grid = STRATEGY_OPTIMIZATION[s_name]["params"]
+    constraint = STRATEGY_OPTIMIZATION[s_name].get("constraint")
+    param_sets = [{}]
+    for _ in range(samples * 20):
+        if len(param_sets) > samples:
+            break
+        params = {name: rng.choice(list(values)) for name, values in grid.items()}
+        if constraint is None or constraint(SimpleNamespace(**params)):
+            param_sets.append(params)
+    return param_sets
+
+def runEngine(engine, data, strategy, params):
+    try:
+        return engine(data, strategy, cash = 10_000_000).run(**params), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+def compareBacktests(reference, candidate):
+    # Fields of the vectorized result that differ from backtesting.py's
+    differing = []
+    if reference["# Trades"] != candidate["# Trades"]:
+        return ["# Trades"]
+    for key in ["Return [%]", "Equity Final [$]"]:
+        if not np.isclose(reference[key], candidate[key], rtol = 1e-9, atol = 1e-6):
+            differing.append(key)
+    if not (reference["Win Rate [%]"] == candidate["Win Rate [%]"] or
+            np.isnan(reference["Win Rate [%]"]) and np.isnan(candidate["Win Rate [%]"])):
+        differing.append("Win Rate [%]")
+    for column in ["EntryBar", "ExitBar", "EntryPrice", "ExitPrice", "PnL"]:
+        if not np.allclose(reference["_trades"][column].to_numpy(dtype = float),
+                           candidate["_trades"][column].to_numpy(dtype = float), rtol = 1e-9, atol = 1e-6):
+            differing.append(column)
+    return differing
+
+def benchBacktestEngines(data, strategies = None, samples = 5, repeat = 3, seed = 0):
+    # Runs every strategy on both engines for the same parameter sets, times them and checks the results agree
+    results, mismatches = [], []
+    for s_name in strategies or STRATEGIES:
+        strategy = STRATEGIES[s_name]
+        param_sets = sampleParams(s_name, samples, seed)
+        for params in param_sets:
+            reference, reference_error = runEngine(Backtest, data, strategy, params)
+            candidate, candidate_error = runEngine(VectorBacktest, data, strategy, params)
+            if reference_error or candidate_error:
+                if bool(reference_error) != bool(candidate_error):
+                    mismatches.append(f"{s_name}{params}: backtesting={reference_error} vector={candidate_error}")
+                continue
+            differing = compareBacktests(reference, candidate)
+            if differing:
+                mismatches.append(f"{s_name}{params}: vector differs from backtesting in {differing}")
+        for name, engine in [("backtesting", Backtest), ("vector", VectorBacktest)]:
+            timing = timeCall(lambda: [runEngine(engine, data, strategy, params) for params in param_sets], repeat)
+            results.append({"bench": "backtest", "case": s_name, "engine": name, "runs": len(param_sets),
+                            "bars": len(data), **timing})
+    return results, mismatches
+
+
+########  Indicator Families  ########
+
+def benchIndicatorFamilies(data, lengths, repeat = 5):
+    # One batched kernel call per indicator against the uncached helper called once per length
+    results, mismatches = [], []
+    for name, (kernel, columns) in INDICATOR_FAMILIES.items():
+        inputs = [data[column] for column in columns]
+        helper = getattr(Strategies, name).__wrapped__
+        family = kernel(*(series.to_numpy(dtype = float) for series in inputs), lengths)
+        for length, row in zip(lengths, family):
+            expected = np.asarray(helper(*inputs, length), dtype = float)
+            if not np.allclose(row, expected, rtol = 1e-9, atol = 1e-9, equal_nan = True):
+                mismatches.append(f"{name}({length}): family differs from the per-length helper")
+        for case, fn in [("per-length", lambda: [helper(*inputs, length) for length in lengths]),
+                         ("family", lambda: kernel(*(series.to_numpy(dtype = float) for series in inputs), lengths))]:
+            results.append({"bench": "indicators", "case": name, "backend": case, "lengths": len(lengths),
+                            "bars": len(data), **timeCall(fn, repeat)})
+    return results, mismatches
+
+def seriesKernelCases(data, ta):
+    # (name, NumPy kernel, pandas_ta or pandas reference), both returning one array or a tuple of them
+    close, high, low, volume = data.Close, data.High, data.Low, data.Volume
+    columns = lambda frame, positions: tuple(frame.reindex(close.index).iloc[:, position] for position in positions)
+    return [
+        ("sma", lambda: smaSeries(close, 20), lambda: ta.sma(close = close, length = 20)),
+        ("ema", lambda: emaSeries(close, 20), lambda: ta.ema(close, length = 20)),
+        ("rsi", lambda: rsiSeries(close, 14), lambda: ta.rsi(close = close, length = 14)),
+        ("atr", lambda: atrSeries(high, low, close, 14),
+         lambda: ta.atr(high = high, low = low, close = close, length = 14)),
+        ("macd", lambda: macdSeries(close, 12, 26, 9),
+         lambda: columns(ta.macd(close = close, fast = 12, slow = 26, signal = 9), [0, 2])),
+        ("bbands", lambda: bbandsSeries(close, 20, 2),
+         lambda: columns(ta.bbands(close = close, length = 20, std = 2), [0, 1, 2])),
+        ("stoch", lambda: stochSeries(high, low, close, 14, 3),
+         lambda: columns(ta.stoch(high = high, low = low, close = close, k = 14, d = 3), [0, 1])),
+        ("rh", lambda: rollingMaxSeries(high, 20), lambda: high.rolling(window = 20).max()),
+        ("rl", lambda: rollingMinSeries(low, 20), lambda: low.rolling(window = 20).min()),
+        ("obv", lambda: obvSeries(close, volume), lambda: ta.obv(close = close, volume = volume))
+    ]
+
+def benchSeriesKernels(data, short = 250, repeat = 5):
+    # The helpers' NumPy kernels against pandas_ta, on the whole series and on a short one where pandas' per call
+    # overhead dominates
+    try:
+        # Only this parity check needs pandas_ta, the runtime no longer does
+        import pandas_ta as ta
+    except ImportError:
+        print("SKIPPED series kernel parity: pandas_ta is not installed")
+        return [], []
+    results, mismatches = [], []
+    stacked = lambda values: np.column_stack([np.asarray(item, dtype = float) for item in
+                                              (values if isinstance(values, tuple) else (values,))])
+    for frame in (data, data.iloc[:short]):
+        for name, kernel, reference in seriesKernelCases(frame, ta):
+            if not np.allclose(stacked(kernel()), stacked(reference()), rtol = 1e-9, atol = 1e-9, equal_nan = True):
+                mismatches.append(f"{name}({len(frame)} bars): kernel differs from pandas_ta")
+            for backend, fn in [("pandas_ta", reference), ("numpy", kernel)]:
+                results.append({"bench": "kernels", "case": name, "backend": backend, "bars": len(frame),
+                                **timeCall(fn, repeat)})
+    return results, mismatches
+
+def incrementalCases(data):
+    # (name, new incremental state, uncached batch computation, input columns)
+    close, high, low, volume = data.Close, data.High, data.Low, data.Volume
+    batch = lambda name: getattr(Strategies, name).__wrapped__
+    return [
+        ("sma", lambda: SmaState(20), lambda: batch("sma")(close, 20), [close]),
+        ("ema", lambda: EmaState(20), lambda: batch("ema")(close, 20), [close]),
+        ("rsi", lambda: RsiState(14), lambda: batch("rsi")(close, 14), [close]),
+        ("atr", lambda: AtrState(14), lambda: batch("atr")(high, low, close, 14), [high, low, close]),
+        ("macd", lambda: MacdState(12, 26, 9), lambda: batch("macd")(close, 12, 26, 9), [close]),
+        ("bbands", lambda: BbandsState(20, 2), lambda: batch("bbands")(close, 20, 2), [close]),
+        ("stoch", lambda: StochState(14, 3), lambda: batch("stoch")(high, low, close, 14, 3),
+         [high, low, close]),
+        ("rh", lambda: RollingMaxState(20), lambda: batch("rh")(high, 20), [high]),
+        ("rl", lambda: RollingMinState(20), lambda: batch("rl")(low, 20), [low]),
+        ("sarimax_ema", lambda: EwmState(100), lambda: SarimaxPredictor._ema(None, close, 100), [close]),
+        ("sarimax_rsi", lambda: RollingRsiState(14), lambda: SarimaxPredictor._rsi(None, close, 14), [close]),
+        ("sarimax_macd", lambda: EwmMacdState(12, 26), lambda: SarimaxPredictor._macd(None, close, 12, 26, 9),
+         [close]),
+        ("sarimax_obv", lambda: ObvState(), lambda: SarimaxPredictor._obv(None, close, volume), [close, volume])
+    ]
+
+def benchIncrementalIndicators(data, repeat = 5):
+    # Recomputing a whole series (what one new bar costs the batch helpers) against one update() per bar. Parity also
+    # covers rolling back: a snapshot taken mid-series, a few extra bars, then restore must change nothing
+    results, mismatches = [], []
+    columns_of = lambda columns: [series.to_numpy(dtype = float).tolist() for series in columns]
+    for name, state, compute, columns in incrementalCases(data):
+        expected = compute()
+        expected = np.column_stack([np.asarray(item, dtype = float) for item in
+                                    (expected if isinstance(expected, tuple) else (expected,))])
+        values = columns_of(columns)
+        streamed = np.array(state().feed(*values), dtype = float).reshape(len(data), -1)
+        if not np.allclose(streamed, expected, rtol = 1e-9, atol = 1e-9, equal_nan = True):
+            mismatches.append(f"{name}: incremental differs from the batch helper")
+        half = len(data) // 2
+        rolled = state()
+        head = rolled.feed(*(column[:half] for column in values))
+        saved = rolled.snapshot()
+        rolled.feed(*(column[half:half + 10] for column in values))
+        tail = rolled.restore(saved).feed(*(column[half:] for column in values))
+        if not np.array_equal(np.array(head + tail, dtype = float).reshape(len(data), -1),
+                              streamed, equal_nan = True):
+            mismatches.append(f"{name}: restoring a snapshot does not reproduce the stream")
+        results.append({"bench": "incremental", "case": name, "backend": "batch", "bars": len(data),
+                        **timeCall(compute, repeat)})
+        # Per bar cost of update(), the whole stream divided by its length
+        timing = timeCall(lambda: state().feed(*values), repeat)
+        results.append({"bench": "incremental", "case": name, "backend": "update", "bars": len(data),
+                        **{key: value / len(data) if key.endswith("_s") else value for key, value in timing.items()}})
+    return results, mismatches
+
+
+########  Offline Suite  ########
+
+def gbmOhlcv(bars = 2000, seed = 0, freq = "D", volatilities = (0.008, 0.015, 0.035), persistence = 0.98,
+             drift = 0.0003):
+    # Geometric Brownian motion whose volatility switches between regimes (a Markov chain staying in its regime with
+    # probability `persistence`), with candle wicks and volume that grow with the regime's volatility
+    rng = np.random.default_rng(seed)
+    volatilities = np.asarray(volatilities, dtype = float)
+    switches = rng.random(bars) > persistence
+    jumps = rng.integers(1, max(len(volatilities), 2), bars)
+    regime = np.cumsum(switches * jumps) % len(volatilities)
+    sigma = volatilities[regime]
+    returns = (drift - sigma ** 2 / 2) + sigma * rng.standard_normal(bars)
+    close = 100 * np.exp(np.cumsum(returns))
+    open = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, 0.2, bars) * sigma)
+    high = np.maximum(open, close) * (1 + np.abs(rng.normal(0, 0.4, bars)) * sigma)
+    low = np.minimum(open, close) * (1 - np.abs(rng.normal(0, 0.4, bars)) * sigma)
+    volume = np.round(50_000 * np.exp(rng.normal(0, 0.3, bars)) * (1 + np.abs(returns) / sigma))
+    index = pd.date_range("2018-01-01", periods = bars, freq = freq, name = "Date")
+    return pd.DataFrame({"Open": open, "High": high, "Low": low, "Close": close, "Volume": volume}, index = index)
+
+
+class SyntheticScraper:
+    # Stands in for StockScraper: every ticker, interval and api gets the same synthetic bars
+    DATA = None
+
+    def __init__(self, ticker = None, interval = None, api = None, use_store = True):
+        self.ticker = ticker
+        self.interval = interval
+        self.api = api
+
+    def getFrame(self):
+        return self.DATA.copy()
+
+    def getData(self):
+        return self.getFrame().to_dict()
+
+@contextlib.contextmanager
+def offlineData(data):
+    # Serves `data` wherever /backtest and /stock-prediction fetch bars, with a throwaway backtest result cache
+    scrapers = [(module, module.StockScraper) for module in (Strategies, Prediction)]
+    result_cache = Strategies.BACKTEST_RESULT_CACHE
+    SyntheticScraper.DATA = data
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            for module, _ in scrapers:
+                module.StockScraper = SyntheticScraper
+            Strategies.BACKTEST_RESULT_CACHE = Strategies.BacktestResultCache(os.path.join(directory, "cache.sqlite"))
+            yield
+        finally:
+            for module, scraper in scrapers:
+                module.StockScraper = scraper
+            Strategies.BACKTEST_RESULT_CACHE = result_cache
+            SyntheticScraper.DATA = None
+
+def timePhases(phases, repeat = 1):
+    # Times a sequence of dependent steps (e.g. prepare, train, forecast) once per repeat, each step separately
+    timings = {name: [] for name, _ in phases}
+    for _ in range(repeat):
+        state = None
+        for name, fn in phases:
+            start = time.perf_counter()
+            state = fn(state)
+            timings[name].append(time.perf_counter() - start)
+    return {name: {"repeat": repeat, "min_s": min(values), "median_s": statistics.median(values),
+                   "mean_s": statistics.fmean(values)} for name, values in timings.items()}
+
+def suiteCase(results, record, fn):
+    # A failing case (e.g. a missing optional optimizer) is reported instead of stopping the suite
+    try:
+        timing = fn()
+    except Exception as e:
+        results.append({**record, "error": f"{type(e).__name__}: {e}"})
+        return
+    results.append({**record, **timing})
+
+def benchStrategies(data, strategies, engines, repeat = 3):
+    # One backtest with the strategy's defaults, indicators computed from scratch every time
+    results = []
+    for s_name in strategies:
+        for engine in engines:
+            engine_class = Strategies.ENGINES[engine][0]
+            run = lambda: (Strategies.INDICATOR_CACHE.clear(),
+                           engine_class(data, STRATEGIES[s_name], cash = 10_000_000).run())
+            suiteCase(results, {"bench": "strategy", "case": s_name, "backend": engine, "bars": len(data)},
+                      lambda: timeCall(run, repeat))
+    return results
+
+def benchOptimization(data, strategies, engines, modes, max_evals = None, repeat = 1):
+    # The whole /backtest path on the synthetic bars: data, indicator warm-up, optimization and both winners' runs
+    results = []
+    with offlineData(data):
+        for s_name in strategies:
+            for engine in engines:
+                for mode in modes:
+                    run = lambda: (Strategies.INDICATOR_CACHE.clear(),
+                                   Strategies.runBacktest("SYNTH", "1day", "synthetic", s_name, engine, mode,
+                                                          use_cache = False, max_evals = max_evals))
+                    suiteCase(results, {"bench": "optimize", "case": s_name, "backend": f"{engine}/{mode}",
+                                        "bars": len(data)}, lambda: timeCall(run, repeat))
+    return results
+
+def benchPredictors(data, predictors, days_ahead = 7, repeat = 1):
+    results = []
+    with offlineData(data):
+        for name in predictors:
+            phases = [
+                ("prepare", lambda _: PREDICTORS[name](ticker = "SYNTH", interval = "1day", api = "synthetic",
+                                                       days_ahead = days_ahead)),
+                ("train", lambda model: (model.train(), model)[1]),
+                ("forecast", lambda model: (model.forecast(), model)[1])
+            ]
+            try:
+                timings = timePhases(phases, repeat)
+            except Exception as e:
+                results.append({"bench": "predictor", "case": name, "bars": len(data),
+                                "error": f"{type(e).__name__}: {e}"})
+                continue
+            for phase, timing in timings.items():
+                results.append({"bench": "predictor", "case": name, "backend": phase, "bars": len(data), **timing})
+    return results
+
+def benchHelpers(data, repeat = 5):
+    # Every indicator helper the strategies call, uncached, with its default parameters
+    close, high, low, volume = data.Close, data.High, data.Low, data.Volume
+    cases = {"sma": [close], "ema": [close], "rsi": [close], "atr": [high, low, close], "rh": [high], "rl": [low],
+             "macd": [close], "bbands": [close], "stoch": [high, low, close], "obv": [close, volume]}
+    results = []
+    for name, inputs in cases.items():
+        helper = getattr(Strategies, name).__wrapped__
+        suiteCase(results, {"bench": "helper", "case": name, "backend": "numpy", "bars": len(data)},
+                  lambda: timeCall(lambda: helper(*inputs), repeat))
+    return results
+
+def slidingWindows(data, bars):
+    # The windows StockScraper serves over a few days: unchanged, last bar revised, a new bar appended, slid forward by
+    # one bar (the oldest one dropped off the front) and slid by more than the refresh budget
+    window = data.iloc[:bars]
+    revised = window.copy()
+    revised.iloc[-1, revised.columns.get_loc("Close")] *= 1.01
+    shift = bars // 4
+    return [
+        ("unchanged", window),
+        ("revised", revised),
+        ("appended", data.iloc[:bars + 1]),
+        ("slid", data.iloc[1:bars + 1]),
+        ("slid_revised", pd.concat([data.iloc[2:bars + 1], data.iloc[[bars + 1]] * 1.01])),
+        ("history_changed", pd.concat([window.iloc[:1] * 1.01, window.iloc[1:]])),
+        ("slid_far", data.iloc[shift:bars + shift])
+    ]
+
+def checkResultCache(data, bars = 1000):
+    # Backtest result cache statuses on sliding windows against a search cached for the first window
+    expected = {"unchanged": "hit", "revised": "partial", "appended": "partial", "slid": "partial",
+                "slid_revised": "partial", "history_changed": "cold", "slid_far": "cold"}
+    results, mismatches = [], []
+    with tempfile.TemporaryDirectory() as directory:
+        cache = Strategies.BacktestResultCache(os.path.join(directory, "cache.sqlite"))
+        window = data.iloc[:bars]
+        cache.put("check", window, len(window), cache.barTimes(window)[-1], {}, {})
+        cached = cache.get("check")
+        for case, frame in slidingWindows(data, bars):
+            start = time.perf_counter()
+            status = cache.status(cached, frame)
+            results.append({"bench": "cache", "case": case, "backend": "backtest", "bars": len(frame),
+                            "status": status, "median_s": time.perf_counter() - start})
+            if status != expected[case]:
+                mismatches.append(f"backtest cache {case}: {status}, expected {expected[case]}")
+    return results, mismatches
+
+def checkModelRegistry(data, predictors, bars = 1000):
+    # Model registry statuses of every predictor's training frame on the same sliding windows. SARIMAX's EMA and OBV
+    # run from the window's start, so a window that slid (or whose first bar changed) is filtered again, not appended
+    expected = {"unchanged": "hit", "revised": "revise", "appended": "append", "slid": "revise",
+                "slid_revised": "revise", "history_changed": "cold", "slid_far": "refit"}
+    results, mismatches = [], []
+    with tempfile.TemporaryDirectory() as directory:
+        registry = Prediction.ModelRegistry(os.path.join(directory, "registry.sqlite"))
+        for name in predictors:
+            frames = {}
+            for case, frame in slidingWindows(data, bars):
+                with offlineData(frame):
+                    frames[case] = PREDICTORS[name](ticker = "SYNTH", interval = "1day", api = "synthetic",
+                                                    days_ahead = 7).df
+            endog = PREDICTORS[name].ENDOG
+            window = frames["unchanged"]
+            registry.put(name, window, endog, len(window), registry.barTimes(window)[-1], int(time.time()), None)
+            entry = registry.get(name)
+            for case, frame in frames.items():
+                start = time.perf_counter()
+                status = registry.status(entry, frame, endog)
+                results.append({"bench": "cache", "case": case, "backend": name, "bars": len(frame),
+                                "status": status, "median_s": time.perf_counter() - start})
+                wanted = "revise" if name == "sarimax" and case == "history_changed" else expected[case]
+                if status != wanted:
+                    mismatches.append(f"model registry {name} {case}: {status}, expected {wanted}")
+    return results, mismatches
+
+def resultKey(result):
+    return tuple(sorted((key, str(value)) for key, value in result.items()
+                        if key in ("bench", "case", "backend", "engine", "bars", "lengths", "runs")))
+
+def compareResults(baseline, results, threshold = 1.25):
+    # Median time of every case against the same case in an earlier results file, slower than threshold x regresses
+    previous = {resultKey(result): result for result in baseline["results"] if "median_s" in result}
+    comparisons, regressions = [], []
+    for result in results:
+        before = previous.get(resultKey(result))
+        if before is None or "median_s" not in result or not before["median_s"]:
+            continue
+        ratio = result["median_s"] / before["median_s"]
+        comparisons.append({**{key: result[key] for key in ("bench", "case", "backend") if key in result},
+                            "before_s": before["median_s"], "median_s": result["median_s"], "ratio": ratio})
+        if ratio > threshold:
+            regressions.append(f"{result['bench']} {result['case']} {result.get('backend', '')}: "
+                               f"{ratio:.2f}x slower than the baseline")
+    return comparisons, regressions
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Offline benchmarks for AlgoTradingTools")
+    commands = parser.add_subparsers(dest = "command", required = True)
+
+    news = commands.add_parser("news", help = "Benchmark and parity-check the news parser backends")
+    news.add_argument("--fixtures", help = "Directory of recorded html pages, generated synthetic listings without it")
+    news.add_argument("--record", action = "store_true", help = "Download fresh fixtures before benchmarking")
+    news.add_argument("--seed", type = int, default = 0, help = "Seed of the synthetic listings")
+    news.add_argument("--repeat", type = int, default = 10)
+    news.add_argument("--workers", type = int, default = 0, help = "Also time parsing all pages in a process pool")
+    news.add_argument("--output", help = "Write results as JSON to this file")
+
+    klines = commands.add_parser("klines", help = "Check and time the windowed Binance kline fetch against a local "
+                                                 "replay server, and check the stream's bar buffer")
+    klines.add_argument("--bars", type = int, default = 20000, help = "1min bars served by the replay server")
+    klines.add_argument("--seed", type = int, default = 0)
+    klines.add_argument("--workers", type = int, nargs = "+", default = [1, 8], help = "Fetcher thread counts")
+    klines.add_argument("--latency", type = float, default = 0.02, help = "Seconds the server waits per request")
+    klines.add_argument("--repeat", type = int, default = 3)
+    klines.add_argument("--output", help = "Write results as JSON to this file")
+
+    backtest = commands.add_parser("backtest", help = "Benchmark and parity-check the vectorized backtest engine")
+    backtest.add_argument("--ticker", help = "Backtest on real bars instead of synthetic ones")
+    backtest.add_argument("--interval", default = "1day")
+    backtest.add_argument("--api", default = "yfinance")
+    backtest.add_argument("--bars", type = int, default = 2000, help = "Length of the synthetic series")
+    backtest.add_argument("--seed", type = int, default = 0)
+    backtest.add_argument("--strategies", nargs = "+", choices = list(STRATEGIES))
+    backtest.add_argument("--samples", type = int, default = 5, help = "Random parameter sets per strategy")
+    backtest.add_argument("--repeat", type = int, default = 3)
+    backtest.add_argument("--output", help = "Write results as JSON to this file")
+
+    indicators = commands.add_parser("indicators",
+                                     help = "Benchmark and parity-check the batched, series and incremental indicators")
+    indicators.add_argument("--bars", type = int, default = 2000, help = "Length of the synthetic series")
+    indicators.add_argument("--seed", type = int, default = 0)
+    indicators.add_argument("--lengths", type = int, nargs = "+", default = list(range(5, 101, 5)))
+    indicators.add_argument("--repeat", type = int, default = 5)
+    indicators.add_argument("--output", help = "Write results as JSON to this file")
+
+    suite = commands.add_parser("suite", help = "Time strategies, optimization, predictors and indicator helpers "
+                                               "offline on synthetic GBM bars")
+    suite.add_argument("--bars", type = int, default = 2000, help = "Length of the synthetic series")
+    suite.add_argument("--seed", type = int, default = 0)
+    suite.add_argument("--freq", default = "D", help = "Bar spacing of the synthetic series, e.g. D or 5min")
+    suite.add_argument("--sections", nargs = "+", default = ["strategies", "optimize", "predictors", "helpers"],
+                       choices = ["strategies", "optimize", "predictors", "helpers"])
+    suite.add_argument("--strategies", nargs = "+", choices = list(STRATEGIES), default = list(STRATEGIES))
+    suite.add_argument("--engines", nargs = "+", choices = list(Strategies.ENGINES), default = list(Strategies.ENGINES))
+    suite.add_argument("--optimize", nargs = "+", choices = Strategies.OPTIMIZATION_MODES, default = ["separate"])
+    suite.add_argument("--max-evals", type = int, help = "Evaluation budget of the halving optimizer")
+    suite.add_argument("--predictors", nargs = "+", choices = list(PREDICTORS), default = list(PREDICTORS))
+    suite.add_argument("--days-ahead", type = int, default = 7)
+    suite.add_argument("--repeat", type = int, default = 3, help = "Repeats of single backtests and helpers")
+    suite.add_argument("--slow-repeat", type = int, default = 1, help = "Repeats of optimizations and predictors")
+    suite.add_argument("--compare", help = "Earlier --output file to compare the median times against")
+    suite.add_argument("--threshold", type = float, default = 1.25, help = "Slowdown ratio that counts as regression")
+    suite.add_argument("--output", help = "Write results as JSON to this file")
+
+    caches = commands.add_parser("caches", help = "Check the backtest result cache and model registry statuses on "
+                                                 "sliding windows")
+    caches.add_argument("--bars", type = int, default = 1000, help = "Length of the cached window")
+    caches.add_argument("--seed", type = int, default = 0)
+    caches.add_argument("--predictors", nargs = "+", choices = list(PREDICTORS), default = list(PREDICTORS))
+    caches.add_argument("--output", help = "Write results as JSON to this file")
+
+    args = parser.parse_args(argv)
+    if args.command == "news":
+        if args.record and not args.fixtures:
+            parser.error("--record needs --fixtures")
+        if args.record:
+            recordNewsFixtures(args.fixtures)
+        if args.fixtures:
+            fixtures, synthetic = loadNewsFixtures(args.fixtures), False
+        else:
+            fixtures, synthetic = syntheticNewsPages(args.seed), True
+            print("SYNTHETIC fixtures: generated listing pages, not recorded ones (see --fixtures / --record)")
+        results, mismatches = benchNewsParsers(fixtures, repeat = args.repeat, workers = args.workers,
+                                               synthetic = synthetic)
+        printResults(results, ["source", "fixtures", "backend", "kb", "items", "median_s"])
+        if args.output:
+            writeResults(results, args.output)
+        for mismatch in mismatches:
+            print(f"PARITY MISMATCH {mismatch}")
+        return 1 if mismatches else 0
+    if args.command == "klines":
+        results, mismatches = benchKlineFetcher(args.bars, args.seed, args.workers, args.latency, repeat = args.repeat)
+        mismatches += checkBarRingBuffer()
+        printResults(results, ["case", "backend", "bars", "requests", "concurrent", "median_s"])
+        if args.output:
+            writeResults(results, args.output)
+        for mismatch in mismatches:
+            print(f"PARITY MISMATCH {mismatch}")
+        return 1 if mismatches else 0
+    if args.command == "backtest":
+        if args.ticker:
+            data = StockScraper(ticker = args.ticker, interval = args.interval, api = args.api).getFrame().dropna()
+        else:
+            data = syntheticOhlcv(args.bars, args.seed)
+        results, mismatches = benchBacktestEngines(data, args.strategies, samples = args.samples,
+                                                   repeat = args.repeat, seed = args.seed)
+        mismatches += checkLttbIndices(args.seed)
+        printResults(results, ["case", "engine", "runs", "bars", "median_s"])
+        if args.output:
+            writeResults(results, args.output)
+        for mismatch in mismatches:
+            print(f"PARITY MISMATCH {mismatch}")
+        return 1 if mismatches else 0
+    if args.command == "suite":
+        data = gbmOhlcv(args.bars, args.seed, args.freq)
+        results = []
+        if "strategies" in args.sections:
+            results += benchStrategies(data, args.strategies, args.engines, repeat = args.repeat)
+        if "optimize" in args.sections:
+            results += benchOptimization(data, args.strategies, args.engines, args.optimize, args.max_evals,
+                                         repeat = args.slow_repeat)
+        if "predictors" in args.sections:
+            results += benchPredictors(data, args.predictors, args.days_ahead, repeat = args.slow_repeat)
+        if "helpers" in args.sections:
+            results += benchHelpers(data, repeat = args.repeat)
+        printResults(results, ["bench", "case", "backend", "bars", "median_s"])
+        for result in results:
+            if "error" in result:
+                print(f"FAILED {result['bench']} {result['case']} {result.get('backend', '')}: {result['error']}")
+        if args.output:
+            writeResults(results, args.output, config = {key: value for key, value in vars(args).items()
+                                                         if key not in ("command", "output", "compare")})
+        regressions = []
+        if args.compare:
+            with open(args.compare) as file:
+                comparisons, regressions = compareResults(json.load(file), results, args.threshold)
+            printResults(comparisons, ["bench", "case", "backend", "before_s", "median_s", "ratio"])
+            for regression in regressions:
+                print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    if args.command == "caches":
+        # Business days, so no window ends on a bar the predictors' business-day frames drop
+        data = gbmOhlcv(args.bars * 2, args.seed, "B")
+        results, mismatches = checkResultCache(data, args.bars)
+        registry_results, registry_mismatches = checkModelRegistry(data, args.predictors, args.bars)
+        results += registry_results
+        mismatches += registry_mismatches
+        printResults(results, ["bench", "case", "backend", "bars", "status"])
+        if args.output:
+            writeResults(results, args.output)
+        for mismatch in mismatches:
+            print(f"STATUS MISMATCH {mismatch}")
+        return 1 if mismatches else 0
+    if args.command == "indicators":
+        data = syntheticOhlcv(args.bars, args.seed)
+        results, mismatches = benchIndicatorFamilies(data, args.lengths, repeat = args.repeat)
+        kernel_results, kernel_mismatches = benchSeriesKernels(data, repeat = args.repeat)
+        results += kernel_results
+        mismatches += kernel_mismatches
+        incremental_results, incremental_mismatches = benchIncrementalIndicators(data, repeat = args.repeat)
+        results += incremental_results
+        mismatches += incremental_mismatches
+        printResults(results, ["bench", "case", "backend", "bars", "median_s"])
+        if args.output:
+            writeResults(results, args.output)
+        for mismatch in mismatches:
+            print(f"PARITY MISMATCH {mismatch}")
+        return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,251 @@
 import os
 import re
+import json
 import time
+import hashlib
+import sqlite3
+import asyncio
+import threading
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 import requests_cache
+import lxml.html
 import yfinance as yf
+from io import BytesIO
+from collections import OrderedDict
 from bs4 import BeautifulSoup
-from binance.client import Client
+from urllib3.util.retry import Retry
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timedelta
-from playwright.sync_api import sync_playwright
-from concurrent.futures import ThreadPoolExecutor
+from playwright.async_api import async_playwright
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+from Streaming import KlineStream
+
+
+class BrowserPool:
+    # One long-lived Firefox shared by all requests, pages are handed out from a bounded set of reusable slots
+    MAX_PAGES = int(os.environ.get("BROWSER_POOL_SIZE", 4))
+    RECYCLE_AFTER = int(os.environ.get("BROWSER_RECYCLE_AFTER", 50))
+
+    class _Slot:
+        __slots__ = ("context", "page", "uses", "generation")
+
+        def __init__(self):
+            self.context = None
+            self.page = None
+            self.uses = 0
+            self.generation = -1
+
+    def __init__(self, max_pages = None, recycle_after = None):
+        self.max_pages = max_pages or self.MAX_PAGES
+        self.recycle_after = recycle_after or self.RECYCLE_AFTER
+        self._playwright = None
+        self._browser = None
+        self._generation = 0
+        self._slots = None
+        self._lock = None
+
+    async def _ensureBrowser(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+            self._slots = asyncio.Queue()
+            for _ in range(self.max_pages):
+                self._slots.put_nowait(self._Slot())
+        async with self._lock:
+            if self._browser is not None and self._browser.is_connected():
+                return
+            try:
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.firefox.launch(
+                    headless=True, args=["--disable-blink-features=AutomationControlled"])
+                # Pages opened on a previous browser are dead, their slots reopen on next use
+                self._generation += 1
+            except Exception as e:
+                raise Exception(f"Error launching Playwright Firefox\n {e}")
+
+    async def _closeSlot(self, slot):
+        if slot.context is not None:
+            try:
+                await slot.context.close()
+            except Exception:
+                pass
+        slot.context, slot.page, slot.uses = None, None, 0
+
+    async def _openSlot(self, slot):
+        await self._closeSlot(slot)
+        slot.context = await self._browser.new_context()
+        slot.page = await slot.context.new_page()
+        slot.generation = self._generation
+
+    async def healthCheck(self, slot):
+        # Whether a checked out page can serve the next request: opened on the current browser, not due for recycling
+        # and still answering (a crashed or closed page is reopened instead of failing the request)
+        if slot.page is None or slot.generation != self._generation or slot.uses >= self.recycle_after:
+            return False
+        if slot.page.is_closed():
+            return False
+        try:
+            await asyncio.wait_for(slot.page.evaluate("1"), timeout = 5)
+        except Exception:
+            return False
+        return True
+
+    async def fetch(self, url):
+        await self._ensureBrowser()
+        slots = self._slots
+        slot = await slots.get()
+        try:
+            if not await self.healthCheck(slot):
+                await self._openSlot(slot)
+            await slot.page.goto(url, wait_until='domcontentloaded')
+            html = await slot.page.content()
+            slot.uses += 1
+            return html
+        except Exception as e:
+            # Never hand a page in an unknown state to the next request
+            await self._closeSlot(slot)
+            raise Exception(f"Error using Playwright Firefox\n {e}")
+        finally:
+            if slots is self._slots:
+                slots.put_nowait(slot)
+            else:
+                # The pool was closed while this page was out, it is not returned to a queue that no longer exists
+                await self._closeSlot(slot)
+
+    async def close(self):
+        if self._slots is not None:
+            slots, self._slots, self._lock = self._slots, None, None
+            while not slots.empty():
+                await self._closeSlot(slots.get_nowait())
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+class NewsIndex:
+    # Persistent index of every headline seen, keyed by normalized link, read back incrementally by row id cursor
+    INDEX_PATH = os.environ.get("NEWS_INDEX_PATH", "news_index.sqlite")
+    DUPLICATE_THRESHOLD = 0.8
+    DUPLICATE_WINDOW = 2 * 24 * 3600
+    STOPWORDS = frozenset(["a", "an", "the", "of", "to", "in", "on", "for", "and", "or", "is", "are", "at", "by",
+                           "with", "as", "from", "its", "it", "be", "after", "over", "amid"])
+
+    def __init__(self, path = None):
+        self.path = path or self.INDEX_PATH
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread = False)
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS news (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT UNIQUE, news_type TEXT, source TEXT,
+                title TEXT, description TEXT, link TEXT, first_seen INTEGER, duplicate_of INTEGER)""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS news_type_id ON news (news_type, id)")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def normalizeLink(link):
+        link = link.strip().split("#")[0].split("?")[0].rstrip("/")
+        return re.sub(r"^https?://(www\.)?", "", link, flags = re.IGNORECASE).lower()
+
+    @classmethod
+    def titleTokens(cls, title):
+        return frozenset(token for token in re.findall(r"[a-z0-9]+", title.lower()) if token not in cls.STOPWORDS)
+
+    @staticmethod
+    def similarity(tokens, other):
+        if not tokens or not other:
+            return 0.0
+        return len(tokens & other) / len(tokens | other)
+
+    def ingest(self, news_type, items):
+        now = int(time.time() * 1000)
+        added = 0
+        with self._lock:
+            conn = self._connect()
+            recent = [(row[0], self.titleTokens(row[1])) for row in conn.execute(
+                "SELECT id, title FROM news WHERE news_type = ? AND duplicate_of IS NULL AND first_seen >= ?",
+                (news_type, now - self.DUPLICATE_WINDOW * 1000))]
+            for item in items:
+                link_key = self.normalizeLink(item["link"]) if item.get("link") else " ".join(sorted(self.titleTokens(item["title"])))
+                key = hashlib.sha1(f"{news_type}|{link_key}".encode()).hexdigest()
+                if conn.execute("SELECT 1 FROM news WHERE key = ?", (key,)).fetchone():
+                    continue
+                tokens = self.titleTokens(item["title"])
+                duplicate_of = None
+                for row_id, other in recent:
+                    if self.similarity(tokens, other) >= self.DUPLICATE_THRESHOLD:
+                        duplicate_of = row_id
+                        break
+                cursor = conn.execute(
+                    "INSERT INTO news (key, news_type, source, title, description, link, first_seen, duplicate_of) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, news_type, item.get("source"), item["title"], item.get("description"), item.get("link"),
+                     now, duplicate_of))
+                if duplicate_of is None:
+                    recent.append((cursor.lastrowid, tokens))
+                    added += 1
+            conn.commit()
+        return added
+
+    def read(self, news_type, since = 0, limit = None):
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT id, source, title, description, link, first_seen FROM news "
+                "WHERE news_type = ? AND id > ? AND duplicate_of IS NULL ORDER BY id" + (" LIMIT ?" if limit else ""),
+                (news_type, since, limit) if limit else (news_type, since)).fetchall()
+            cursor = conn.execute("SELECT MAX(id) FROM news WHERE news_type = ?", (news_type,)).fetchone()[0]
+        items = [{"id": row[0], "source": row[1], "title": row[2], "description": row[3], "link": row[4],
+                  "first_seen": row[5]} for row in rows]
+        # With a limit the cursor stops at the last returned row so the remaining items come next time
+        if limit and items:
+            cursor = items[-1]["id"]
+        return {"items": items, "cursor": max(cursor or 0, since)}
 
 
 class NewsScraper:
+    BROWSER_POOL = BrowserPool()
+    NEWS_INDEX = NewsIndex()
+    NEWS_CACHE_TTL = int(os.environ.get("NEWS_CACHE_TTL", 300))
+    PARSE_CACHE_SIZE = 64
+    _parse_cache = OrderedDict()
+    _parse_cache_lock = threading.Lock()
+    # Sources whose listings are in the server HTML are fetched over plain HTTP, the marker tells a real
+    # listing page apart from a block or consent page, which then falls back to the browser
+    NEWS_SOURCES = {
+        "moneycontrol": {
+            "needs_js": False, "marker": 'id="cagetory"',
+            "parsers": {"bs4": "_useMoneycontrolParser", "lxml": "_useMoneycontrolLxmlParser"}
+        },
+        "businesstoday": {
+            "needs_js": False, "marker": "section-listing-LHS",
+            "parsers": {"bs4": "_useBusinesstodayParser", "lxml": "_useBusinesstodayLxmlParser"}
+        },
+        "investing": {
+            "needs_js": True, "marker": 'data-test="article-item"',
+            "parsers": {"bs4": "_useInvestingParser", "lxml": "_useInvestingLxmlParser"}
+        },
+        "zerodha": {
+            "needs_js": False, "marker": 'id="news"',
+            "parsers": {"bs4": "_useZerodhaParser", "lxml": "_useZerodhaLxmlParser"}
+        }
+    }
+    PARSER_BACKENDS = ("lxml", "bs4")
+    PARSER_BACKEND = os.environ.get("NEWS_PARSER_BACKEND", "lxml")
+    HTTP_HEADERS = {
+        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0",
+        "Accept": "text/html,application/xhtml+xml",
+        "Accept-Language": "en-US,en;q=0.9"
+    }
     NEWS_URLS = {
         "last24h": [
             "https://pulse.zerodha.com/"
@@ -42,15 +275,21 @@ class NewsScraper:
         ]
     }
 
-    def __init__(self, news_type = "last24h"):
+    def __init__(self, news_type = "last24h", parser_backend = None):
         if news_type not in self.NEWS_URLS:
             raise Exception(f"Invalid News Type.\n Following are the types:{', '.join(self.NEWS_URLS.keys())}")
+        parser_backend = parser_backend or self.PARSER_BACKEND
+        if parser_backend not in self.PARSER_BACKENDS:
+            raise Exception(f"Invalid Parser Backend.\n Following are the backends:{', '.join(self.PARSER_BACKENDS)}")
         self.htmls = []
         self.links = []
         self.parse_data = []
+        self.parse_sources = []
         self.news_type = news_type
+        self.parser_backend = parser_backend
     
-    def _useZerodhaParser(self, html):
+    @staticmethod
+    def _useZerodhaParser(html):
         ########  Pulse By Zerodha Scraper  ########
         soup = BeautifulSoup(html, "html.parser")
         blocks = soup.find("ul", id = "news").find_all("li", class_ = "box item")
@@ -61,7 +300,8 @@ class NewsScraper:
             links.append(block.find("a").get("href"))
         return ({"Titles": titles, "Descriptions": descriptions, "Links":links})
     
-    def _useInvestingParser(self, html):
+    @staticmethod
+    def _useInvestingParser(html):
         ########  In.Investing Scraper  ########
         soup = BeautifulSoup(html, "html.parser")
         blocks = soup.find_all("article", attrs={"data-test":"article-item"})
@@ -72,7 +312,8 @@ class NewsScraper:
             links.append(block.find("a", attrs={"data-test":"article-title-link"}).get("href"))
         return ({"Titles": titles, "Descriptions": descriptions, "Links":links})
     
-    def _useMoneycontrolParser(self, html):
+    @staticmethod
+    def _useMoneycontrolParser(html):
         ########  MoneyControl Scraper  ########
         soup = BeautifulSoup(html, 'html.parser')
         blocks = soup.find("ul", id = "cagetory").find_all("li", class_ = "clearfix")
@@ -83,7 +324,8 @@ class NewsScraper:
             links.append(block.find("h2").find("a").get("href"))
         return ({"Titles": titles, "Descriptions": descriptions, "Links":links})
     
-    def _useBusinesstodayParser(self, html):
+    @staticmethod
+    def _useBusinesstodayParser(html):
         ########  BusinessToday Scraper  ########
         soup = BeautifulSoup(html, "html.parser")
         blocks = soup.find("div", class_ = "section-listing-LHS").find_all("div", class_ = "widget-listing")
@@ -94,43 +336,158 @@ class NewsScraper:
             links.append(block.find("h2").find("a").get("href"))
         return ({"Titles": titles, "Descriptions": descriptions, "Links":links})
     
-    def _usePlaywright(self, url):
+    @staticmethod
+    def _hasClass(name):
+        return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+    @staticmethod
+    def _useZerodhaLxmlParser(html):
+        ########  Pulse By Zerodha Scraper (lxml)  ########
+        root = lxml.html.fromstring(html)
+        blocks = root.xpath('//ul[@id="news"]')[0].xpath('.//li[@class="box item"]')
+        titles, descriptions, links = [], [], []
+        for block in blocks:
+            anchor = block.xpath('.//a')[0]
+            titles.append(anchor.text_content())
+            descriptions.append(block.xpath(f'.//div[{NewsScraper._hasClass("desc")}]')[0].text_content())
+            links.append(anchor.get("href"))
+        return ({"Titles": titles, "Descriptions": descriptions, "Links":links})
+
+    @staticmethod
+    def _useInvestingLxmlParser(html):
+        ########  In.Investing Scraper (lxml)  ########
+        root = lxml.html.fromstring(html)
+        blocks = root.xpath('//article[@data-test="article-item"]')
+        titles, descriptions, links = [], [], []
+        for block in blocks:
+            anchor = block.xpath('.//a[@data-test="article-title-link"]')[0]
+            titles.append(anchor.text_content())
+            descriptions.append(block.xpath('.//p[@data-test="article-description"]')[0].text_content())
+            links.append(anchor.get("href"))
+        return ({"Titles": titles, "Descriptions": descriptions, "Links":links})
+
+    @staticmethod
+    def _useMoneycontrolLxmlParser(html):
+        ########  MoneyControl Scraper (lxml)  ########
+        root = lxml.html.fromstring(html)
+        blocks = root.xpath('//ul[@id="cagetory"]')[0].xpath(f'.//li[{NewsScraper._hasClass("clearfix")}]')
+        titles, descriptions, links = [], [], []
+        for block in blocks:
+            anchor = block.xpath('.//h2')[0].xpath('.//a')[0]
+            titles.append(anchor.text_content())
+            descriptions.append(block.xpath('.//p')[0].text_content())
+            links.append(anchor.get("href"))
+        return ({"Titles": titles, "Descriptions": descriptions, "Links":links})
+
+    @staticmethod
+    def _useBusinesstodayLxmlParser(html):
+        ########  BusinessToday Scraper (lxml)  ########
+        root = lxml.html.fromstring(html)
+        listing = root.xpath(f'//div[{NewsScraper._hasClass("section-listing-LHS")}]')[0]
+        blocks = listing.xpath(f'.//div[{NewsScraper._hasClass("widget-listing")}]')
+        titles, descriptions, links = [], [], []
+        for block in blocks:
+            anchor = block.xpath('.//h2')[0].xpath('.//a')[0]
+            titles.append(anchor.text_content())
+            descriptions.append(block.xpath('.//p')[0].text_content())
+            links.append(anchor.get("href"))
+        return ({"Titles": titles, "Descriptions": descriptions, "Links":links})
+    
+    @classmethod
+    def sourceOf(cls, url):
+        for source in cls.NEWS_SOURCES:
+            if re.search(rf"{source}", url):
+                return source
+        return None
+
+    def _useHttp(self, url, source):
+        session = StockScraper.SESSION_POOL.getSession("news", expire_after = self.NEWS_CACHE_TTL)
         try:
-            with sync_playwright() as p:
-                browser = p.firefox.launch(headless=True, args=["--disable-blink-features=AutomationControlled"])
-                page = browser.new_page()
-                page.goto(url, wait_until='domcontentloaded')
-                html = page.content()
-                self.htmls.append(html)
-                self.links.append(url)
-                browser.close()
-        except Exception as e:
-            raise Exception(f"Error using Playwright Firefox\n {e}")
+            # Stale entries are revalidated with If-None-Match / If-Modified-Since by the cached session
+            response = session.get(url, headers = self.HTTP_HEADERS, timeout = 15)
+            response.raise_for_status()
+        except Exception:
+            return None
+        html = response.text
+        if self.NEWS_SOURCES[source]["marker"] not in html:
+            return None
+        return html
+
+    async def _fetchPage(self, url):
+        source = self.sourceOf(url)
+        if source is not None and not self.NEWS_SOURCES[source]["needs_js"]:
+            html = await asyncio.to_thread(self._useHttp, url, source)
+            if html is not None:
+                return html
+        return await self.BROWSER_POOL.fetch(url)
 
-    def scrapePages(self):
+    async def scrapePagesAsync(self):
         urls = self.NEWS_URLS[self.news_type]
-        with ThreadPoolExecutor() as executor:
-            try:
-                executor.map(self._usePlaywright, urls)
-            except Exception as e:
-                raise Exception(f"Error in scraping with Playwright Firefox\n {e}")
-                
-    def parsePages(self):
+        try:
+            htmls = await asyncio.gather(*[self._fetchPage(url) for url in urls])
+        except Exception as e:
+            raise Exception(f"Error in scraping with Playwright Firefox\n {e}")
+        self.htmls.extend(htmls)
+        self.links.extend(urls)
+
+    @classmethod
+    def parseHtml(cls, source, html, parser_backend = None):
+        parser_name = cls.NEWS_SOURCES[source]["parsers"][parser_backend or cls.PARSER_BACKEND]
+        return getattr(cls, parser_name)(html)
+
+    def parsePages(self, executor = None):
+        # executor may be a ProcessPoolExecutor, the parsers are static so only the html is shipped to workers
         if not all([self.htmls, self.links]):
             raise Exception(f"Error in Parsing Pages")
         scraped_data = list(zip(self.htmls, self.links))
-        parsers = [
-            ("moneycontrol", self._useMoneycontrolParser),
-            ("businesstoday", self._useBusinesstodayParser),
-            ("investing", self._useInvestingParser),
-            ("zerodha", self._useZerodhaParser)
-        ]
+        pending = []
         for html, link in scraped_data:
-            for source, parser_func in parsers:
-                if re.search(rf"{source}", link):
-                    self.parse_data.append(parser_func(html=html))
-                    break
-                    
+            source = self.sourceOf(link)
+            if source is None:
+                continue
+            key = (link, self.parser_backend, hashlib.sha1(html.encode()).hexdigest())
+            with self._parse_cache_lock:
+                parsed = self._parse_cache.get(key)
+                if parsed is not None:
+                    self._parse_cache.move_to_end(key)
+            if parsed is None:
+                if executor is not None:
+                    parsed = executor.submit(self.parseHtml, source, html, self.parser_backend)
+                else:
+                    parsed = self.parseHtml(source, html, self.parser_backend)
+            pending.append((key, source, parsed))
+        for key, source, parsed in pending:
+            if isinstance(parsed, Future):
+                parsed = parsed.result()
+            with self._parse_cache_lock:
+                self._parse_cache[key] = parsed
+                self._parse_cache.move_to_end(key)
+                while len(self._parse_cache) > self.PARSE_CACHE_SIZE:
+                    self._parse_cache.popitem(last = False)
+            self.parse_data.append(parsed)
+            self.parse_sources.append(source)
+        # Every fetched batch goes into the index, so first-seen times and duplicates are recorded whether or not
+        # the caller reads incrementally
+        try:
+            self.NEWS_INDEX.ingest(self.news_type, self.getItems())
+        except Exception as e:
+            raise Exception(f"Error in updating news index\n {e}")
+
+    def getItems(self):
+        items = []
+        for news_dict, source in zip(self.parse_data, self.parse_sources):
+            for title, description, link in zip(news_dict["Titles"], news_dict["Descriptions"], news_dict["Links"]):
+                items.append({"title": title.strip(), "description": description.strip(), "link": link, "source": source})
+        return items
+
+    def getNewData(self, since = 0, limit = None):
+        if not self.parse_data:
+            raise Exception(f"Error in getting news data")
+        try:
+            return self.NEWS_INDEX.read(self.news_type, since = since, limit = limit)
+        except Exception as e:
+            raise Exception(f"Error in reading news index\n {e}")
+
     def getData(self):
         if not self.parse_data:
             raise Exception(f"Error in getting news data")
@@ -141,9 +498,343 @@ class NewsScraper:
         return merged_df.to_dict()
 
 
+class CountingCachedSession(requests_cache.CachedSession):
+
+    def __init__(self, *args, pool = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = pool
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if self.pool is not None:
+            self.pool.record(getattr(response, "from_cache", False))
+        return response
+
+
+class SessionPool:
+    # Cached responses live roughly as long as one bar of the requested interval
+    CACHE_TTL = {
+        "1min": 30, "5min": 120, "1hr": 15 * 60, "1day": 4 * 3600, "1week": 12 * 3600, "1mon": 24 * 3600
+    }
+    MAX_CACHE_ENTRIES = int(os.environ.get("HTTP_CACHE_MAX_ENTRIES", 5000))
+    MAINTAIN_EVERY = 250
+
+    def __init__(self, max_entries = None, pool_size = 16):
+        self.max_entries = max_entries or self.MAX_CACHE_ENTRIES
+        self.pool_size = pool_size
+        self._sessions = {}
+        self._backends = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._since_maintain = 0
+
+    def getSession(self, api, interval = None, expire_after = None):
+        key = (api, interval)
+        with self._lock:
+            if key not in self._sessions:
+                if api not in self._backends:
+                    self._backends[api] = requests_cache.SQLiteCache(f"{api}.cache")
+                if expire_after is None:
+                    expire_after = self.CACHE_TTL.get(interval, 3600)
+                session = CountingCachedSession(backend = self._backends[api], expire_after = expire_after, pool = self)
+                session.headers["User-agent"] = "data-retriever"
+                adapter = HTTPAdapter(pool_connections = 4, pool_maxsize = self.pool_size,
+                                      max_retries = Retry(total = 3, backoff_factor = 0.5,
+                                                          status_forcelist = (429, 500, 502, 503, 504)))
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[key] = session
+            return self._sessions[key]
+
+    def record(self, from_cache):
+        with self._lock:
+            if from_cache:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._since_maintain += 1
+            maintain = self._since_maintain >= self.MAINTAIN_EVERY
+            if maintain:
+                self._since_maintain = 0
+        if maintain:
+            self.maintain()
+
+    def maintain(self):
+        with self._lock:
+            backends = list(self._backends.values())
+        for backend in backends:
+            try:
+                backend.delete(expired = True)
+                excess = len(backend.responses) - self.max_entries
+                if excess > 0:
+                    oldest = sorted(backend.responses.items(), key = lambda item: item[1].created_at)[:excess]
+                    backend.delete(*[key for key, _ in oldest])
+            except Exception:
+                # Eviction is best effort, a failed sweep is retried on the next maintenance round
+                pass
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "sessions": len(self._sessions)
+            }
+
+
+class BinanceKlineFetcher:
+    BASE_URL = os.environ.get("BINANCE_API_URL", "https://api.binance.com")
+    KLINE_LIMIT = 1000
+    INTERVAL_MS = {
+        "1m": 60_000, "5m": 300_000, "1h": 3_600_000, "1d": 86_400_000, "1w": 604_800_000,
+        # Months vary in length, the shortest one keeps every window under the kline limit
+        "1M": 28 * 86_400_000
+    }
+
+    def __init__(self, base_url = None, max_workers = 8):
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
+        self.max_workers = max_workers
+
+    def _windows(self, interval, start_ms, end_ms):
+        step = self.KLINE_LIMIT * self.INTERVAL_MS[interval]
+        return [(start, min(start + step - 1, end_ms)) for start in range(start_ms, end_ms + 1, step)]
+
+    def _fetchWindow(self, session, symbol, interval, start_ms, end_ms):
+        rows = []
+        while start_ms <= end_ms:
+            response = session.get(f"{self.base_url}/api/v3/klines", params = {
+                "symbol": symbol, "interval": interval,
+                "startTime": start_ms, "endTime": end_ms, "limit": self.KLINE_LIMIT
+            }, timeout = 30)
+            response.raise_for_status()
+            chunk = response.json()
+            rows.extend(chunk)
+            if len(chunk) < self.KLINE_LIMIT or chunk[-1][0] + self.INTERVAL_MS[interval] > end_ms:
+                break
+            start_ms = chunk[-1][0] + 1
+        return rows
+
+    def getKlines(self, symbol, interval, start_ms, end_ms, session):
+        if interval not in self.INTERVAL_MS:
+            raise Exception(f"Unsupported Binance Interval: {interval}")
+        windows = self._windows(interval, start_ms, end_ms)
+        try:
+            with ThreadPoolExecutor(max_workers = min(self.max_workers, max(len(windows), 1))) as executor:
+                chunks = list(executor.map(lambda window: self._fetchWindow(session, symbol, interval, *window),
+                                           windows))
+        except Exception as e:
+            raise Exception(f"Error fetching Binance klines\n {e}")
+        klines = {}
+        for chunk in chunks:
+            for row in chunk:
+                klines[row[0]] = row
+        return [klines[open_time] for open_time in sorted(klines)]
+
+
+class SingleFlight:
+    # Concurrent callers with the same key share one in-flight call, late arrivals reuse its result for memo_ttl seconds
+    MEMO_TTL = float(os.environ.get("FETCH_MEMO_TTL", 5))
+
+    class _Call:
+        __slots__ = ("event", "result", "error")
+
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self, memo_ttl = None):
+        self.memo_ttl = self.MEMO_TTL if memo_ttl is None else memo_ttl
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._memo = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            memo = self._memo.get(key)
+            if memo is not None and memo[0] > time.monotonic():
+                return memo[1]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._Call()
+                self._calls[key] = call
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                    now = time.monotonic()
+                    self._memo = {k: v for k, v in self._memo.items() if v[0] > now}
+                    if call.error is None and self.memo_ttl > 0:
+                        self._memo[key] = (now + self.memo_ttl, call.result)
+                call.event.set()
+        else:
+            call.event.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def forget(self, key):
+        with self._lock:
+            self._memo.pop(key, None)
+
+
+class BarStore:
+    STORE_DIR = os.environ.get("BAR_STORE_DIR", "bar_store")
+
+    def __init__(self, store_dir = None):
+        self.store_dir = store_dir or self.STORE_DIR
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _path(self, api, ticker, interval):
+        name = re.sub(r"[^A-Za-z0-9._-]", "_", ticker)
+        return os.path.join(self.store_dir, api, interval, f"{name}.parquet")
+
+    def lock(self, api, ticker, interval):
+        with self._locks_guard:
+            return self._locks.setdefault((api, ticker, interval), threading.Lock())
+
+    def load(self, api, ticker, interval):
+        path = self._path(api, ticker, interval)
+        if not os.path.exists(path):
+            return None
+        try:
+            return pd.read_parquet(path)
+        except Exception:
+            # A damaged file is treated as a cold store and rebuilt on the next save
+            return None
+
+    def save(self, api, ticker, interval, data):
+        path = self._path(api, ticker, interval)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            data.to_parquet(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            raise Exception(f"Error saving bars to store\n {e}")
+
+
+def lttbIndices(x, y, points):
+    # Largest-Triangle-Three-Buckets: keeps the first and last point and, from every bucket in between, the point
+    # spanning the largest triangle with the previous pick and the next bucket's mean. The global minimum and maximum
+    # then replace the picks of their buckets, so peaks and troughs survive any reduction (both of them even when
+    # they share a bucket). Never returns more than `points` indices: below 3 there is no bucket, so only the last
+    # point (1) or both endpoints (2) are kept, and nothing for 0 or less
+    x = np.asarray(x, dtype = float)
+    y = np.asarray(y, dtype = float)
+    length = len(y)
+    if points <= 0:
+        return np.arange(0)
+    if points >= length:
+        return np.arange(length)
+    if points < 3:
+        return np.array([0, length - 1][-points:])
+    edges = np.append(np.linspace(1, length - 1, points - 1).astype(int), length)
+    selected = np.empty(points, dtype = int)
+    selected[0], selected[-1] = 0, length - 1
+    previous = 0
+    for bucket in range(points - 2):
+        start, end, next_end = edges[bucket], edges[bucket + 1], edges[bucket + 2]
+        mean_x, mean_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[previous] - mean_x) * (y[start:end] - y[previous]) -
+                      (x[previous] - x[start:end]) * (mean_y - y[previous]))
+        previous = start + int(area.argmax())
+        selected[bucket + 1] = previous
+    extremes = sorted({int(y.argmin()), int(y.argmax())} - {0, length - 1})
+    slots = [int(np.searchsorted(edges, extreme, side = "right")) for extreme in extremes]
+    if len(slots) == 2 and slots[0] == slots[1]:
+        # Both extremes fall into one bucket: the later one takes the next bucket's pick (or the earlier one the
+        # previous bucket's), which keeps the points in x order. With a single bucket there is no neighbour to spare,
+        # so it keeps the extreme spanning the larger triangle with the endpoints
+        if slots[1] < points - 2:
+            slots[1] += 1
+        elif slots[0] > 1:
+            slots[0] -= 1
+        else:
+            extremes = np.array(extremes)
+            area = np.abs((x[0] - x[-1]) * (y[extremes] - y[0]) - (x[0] - x[extremes]) * (y[-1] - y[0]))
+            selected[1] = extremes[area.argmax()]
+            return selected
+    selected[slots] = extremes
+    return selected
+
+
+class FrameEncoder:
+    FORMATS = {
+        "columnar": "application/json",
+        "arrow": "application/vnd.apache.arrow.stream",
+        "parquet": "application/vnd.apache.parquet"
+    }
+
+    def __init__(self, data):
+        self.data = data
+
+    @staticmethod
+    def epochMillis(index):
+        index = pd.DatetimeIndex(index)
+        epoch = pd.Timestamp("1970-01-01", tz = "UTC") if index.tz is not None else pd.Timestamp("1970-01-01")
+        return ((index - epoch) // pd.Timedelta(milliseconds = 1)).to_numpy(dtype = np.int64)
+
+    @staticmethod
+    def columnValues(series):
+        values = series.to_numpy(dtype = float)
+        missing = np.isnan(values)
+        if not missing.any():
+            return values.tolist()
+        values = values.astype(object)
+        values[missing] = None
+        return values.tolist()
+
+    def toColumnar(self):
+        return {
+            "index": self.epochMillis(self.data.index).tolist(),
+            "columns": {column: self.columnValues(self.data[column]) for column in self.data.columns}
+        }
+
+    def toArrow(self):
+        table = pa.Table.from_pandas(self.data.rename_axis("Date").reset_index(), preserve_index = False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    def toParquet(self):
+        buffer = BytesIO()
+        self.data.rename_axis("Date").to_parquet(buffer)
+        return buffer.getvalue()
+
+    def encode(self, format):
+        if format not in self.FORMATS:
+            raise Exception(f"Unsupported Format\n Following are the Formats: json, {', '.join(self.FORMATS.keys())}")
+        try:
+            if format == "columnar":
+                content = json.dumps(self.toColumnar(), allow_nan = False)
+            elif format == "arrow":
+                content = self.toArrow()
+            else:
+                content = self.toParquet()
+        except Exception as e:
+            raise Exception(f"Error encoding ticker data as {format}\n {e}")
+        return content, self.FORMATS[format]
+
+
 class StockScraper:
+    BAR_STORE = BarStore()
+    SESSION_POOL = SessionPool()
+    SINGLE_FLIGHT = SingleFlight()
+    KLINE_STREAM = None
+    BINANCE_FETCHER = BinanceKlineFetcher()
     
-    def __init__(self, ticker, interval, api):
+    def __init__(self, ticker, interval, api, use_store = True):
         self.API_CONFIG = {
             'yfinance': {
                 'interval_map': {
@@ -171,11 +862,15 @@ class StockScraper:
         self.ticker = ticker
         self.interval = interval
         self.api = api
+        self.use_store = use_store
+
+    @staticmethod
+    def emptyFrame():
+        return pd.DataFrame(columns = ["Open", "High", "Low", "Close", "Volume"], index = pd.DatetimeIndex([]), dtype = float)
 
     def _useYfinance(self, ticker, interval, start_date, end_date):
         # 1m,5m,1h,1d,1wk,1mo
-        session = requests_cache.CachedSession("yfinance.cache")
-        session.headers["User-agent"] = "data-retriever"
+        session = self.SESSION_POOL.getSession("yfinance", self.interval)
         try:
             data = yf.download(
                 tickers = ticker,
@@ -184,36 +879,241 @@ class StockScraper:
                 end=end_date,
                 session=session,
             )
+            if data.empty:
+                return self.emptyFrame()
             data.columns = ["Close", "High", "Low", "Open", "Volume"]
             data = data[["Open", "High", "Low", "Close", "Volume"]]
-            return data.to_dict()
+            return data
         except Exception as e:
             raise Exception(f"Error occured using Yfinance\n {e}")
     
     def _useBinance(self, ticker, interval, start_date, end_date):
          # 1m,5m,1h,1d,1w,1M
-        client = Client()
         try: 
-            data = pd.DataFrame(client.get_historical_klines(
+            data = pd.DataFrame(self.BINANCE_FETCHER.getKlines(
                 symbol = ticker, 
                 interval = interval, 
-                start_str = start_date,
-                end_str = end_date
+                start_ms = int(pd.Timestamp(start_date, tz = "UTC").timestamp() * 1000),
+                end_ms = int(pd.Timestamp(end_date, tz = "UTC").timestamp() * 1000),
+                session = self.SESSION_POOL.getSession("binance", self.interval)
             ))
+            if data.empty:
+                return self.emptyFrame()
             data = data.iloc[:,:6] 
             data.columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
             data.set_index('Date', inplace=True)
             data.index = pd.to_datetime(data.index, unit='ms')
             data = data.astype(float)
-            return data.to_dict()
+            return data
         except Exception as e:
             raise Exception(f"Error occured using Binance\n {e}")
 
-    def getData(self):
+    def _window(self):
         config = self.API_CONFIG[self.api]
         try: 
             start_date = (datetime.today() - timedelta(days=config['days_map'][self.interval])).strftime('%Y-%m-%d')
             end_date = datetime.now().strftime('%Y-%m-%d')
         except Exception as e:
             raise Exception(f"Error in getting ticker data\n {e}")
-        return config['fetch'](self.ticker, config['interval_map'][self.interval], start_date, end_date)
\ No newline at end of file
+        return start_date, end_date
+
+    def _tailStart(self, stored, start_date):
+        # Re-fetch from the day of the last stored bar so a bar that was still forming gets overwritten
+        if stored is None or stored.empty:
+            return start_date
+        return max(start_date, stored.index[-1].strftime('%Y-%m-%d'))
+
+    def _mergeTail(self, stored, tail, start_date):
+        if stored is None or stored.empty:
+            data = tail
+        elif tail.empty:
+            data = stored
+        else:
+            data = pd.concat([stored, tail])
+            data = data[~data.index.duplicated(keep = "last")].sort_index()
+        window_start = pd.Timestamp(start_date)
+        if getattr(data.index, "tz", None) is not None:
+            window_start = window_start.tz_localize(data.index.tz)
+        return data[data.index >= window_start]
+
+    def _loadFrame(self):
+        config = self.API_CONFIG[self.api]
+        start_date, end_date = self._window()
+        if not self.use_store:
+            return config['fetch'](self.ticker, config['interval_map'][self.interval], start_date, end_date)
+        with self.BAR_STORE.lock(self.api, self.ticker, self.interval):
+            stored = self.BAR_STORE.load(self.api, self.ticker, self.interval)
+            tail_start = self._tailStart(stored, start_date)
+            if tail_start >= end_date:
+                return self._mergeTail(stored, stored.iloc[0:0], start_date)
+            tail = config['fetch'](self.ticker, config['interval_map'][self.interval], tail_start, end_date)
+            data = self._mergeTail(stored, tail, start_date)
+            if not tail.empty:
+                self.BAR_STORE.save(self.api, self.ticker, self.interval, data)
+            return data
+
+    def _streamFrame(self):
+        if self.api != "binance" or self.KLINE_STREAM is None:
+            return None
+        start_date, _ = self._window()
+        start_ms = int(pd.Timestamp(start_date, tz = "UTC").timestamp() * 1000)
+        data = self.KLINE_STREAM.getFrame(self.ticker, self.interval, start_ms)
+        if data is None:
+            return None
+        return self._mergeTail(None, data, start_date)
+
+    def getFrame(self):
+        data = self._streamFrame()
+        if data is not None:
+            return data
+        # Frames are shared between coalesced callers, each one gets its own copy
+        key = (self.api, self.ticker, self.interval, self.use_store)
+        return self.SINGLE_FLIGHT.do(key, self._loadFrame).copy()
+
+    @classmethod
+    def streamCapacity(cls, interval):
+        # Bars of binance's days_map window for the interval. The window starts at midnight `days` days ago, so late
+        # in the day it spans almost days + 1 days; months count as 28 days
+        days = cls(ticker = None, interval = interval, api = "binance").API_CONFIG["binance"]["days_map"][interval]
+        interval_ms = KlineStream.INTERVAL_MS[interval] or 28 * 86_400_000
+        return -(-(days + 1) * 86_400_000 // interval_ms)
+
+    @classmethod
+    def startStreaming(cls, symbols, intervals, capacity = None, source = None, seed = True, record_path = None):
+        # Without a capacity every interval's buffer holds its whole days_map window, so _streamFrame never falls
+        # back to REST for lack of bars
+        capacity = capacity or {interval: cls.streamCapacity(interval) for interval in intervals}
+        stream = KlineStream(symbols, intervals, capacity = capacity, source = source, record_path = record_path)
+        if seed:
+            # Backfill each buffer up to now so live bars continue the history without a hole
+            end_ms = int(time.time() * 1000)
+            for symbol in symbols:
+                for interval in intervals:
+                    interval_ms = stream.INTERVAL_MS[interval]
+                    start_ms = end_ms - stream.capacities[interval] * interval_ms if interval_ms else 0
+                    klines = cls.BINANCE_FETCHER.getKlines(
+                        symbol, stream.INTERVAL_MAP[interval], start_ms, end_ms,
+                        session = cls.SESSION_POOL.getSession("binance", interval))
+                    stream.seed(symbol, interval, [[float(value) for value in kline[:6]] for kline in klines])
+        stream.start()
+        cls.KLINE_STREAM = stream
+        return stream
+
+    @classmethod
+    def stopStreaming(cls):
+        if cls.KLINE_STREAM is not None:
+            cls.KLINE_STREAM.stop()
+            cls.KLINE_STREAM = None
+
+    def tailWindow(self):
+        start_date, end_date = self._window()
+        stored = self.BAR_STORE.load(self.api, self.ticker, self.interval) if self.use_store else None
+        return start_date, end_date, self._tailStart(stored, start_date)
+
+    def appendTail(self, tail, start_date):
+        if not self.use_store:
+            return self._mergeTail(None, tail, start_date)
+        with self.BAR_STORE.lock(self.api, self.ticker, self.interval):
+            stored = self.BAR_STORE.load(self.api, self.ticker, self.interval)
+            data = self._mergeTail(stored, tail, start_date)
+            if not tail.empty:
+                self.BAR_STORE.save(self.api, self.ticker, self.interval, data)
+            return data
+
+    def getData(self):
+        return self.getFrame().to_dict()
+
+
+class BatchStockScraper:
+    MAX_WORKERS = 8
+
+    def __init__(self, tickers, interval, api, use_store = True):
+        tickers = list(dict.fromkeys(ticker.strip() for ticker in tickers if ticker.strip()))
+        if not tickers:
+            raise Exception("No tickers given")
+        self.scrapers = {ticker: StockScraper(ticker = ticker, interval = interval, api = api, use_store = use_store)
+                         for ticker in tickers}
+        self.tickers = tickers
+        self.interval = interval
+        self.api = api
+
+    def _downloadYfinance(self, tickers, start_date, end_date):
+        # One multi-ticker request, split back into one frame per ticker
+        interval = self.scrapers[tickers[0]].API_CONFIG["yfinance"]["interval_map"][self.interval]
+        data = yf.download(
+            tickers = tickers,
+            interval = interval,
+            start = start_date,
+            end = end_date,
+            session = StockScraper.SESSION_POOL.getSession("yfinance", self.interval),
+            group_by = "ticker"
+        )
+        frames = {}
+        for ticker in tickers:
+            if data.empty or ticker not in data.columns.get_level_values(0):
+                frames[ticker] = StockScraper.emptyFrame()
+                continue
+            frames[ticker] = data[ticker][["Open", "High", "Low", "Close", "Volume"]].dropna(how = "all")
+        return frames
+
+    def _iterYfinance(self):
+        groups = {}
+        for ticker, scraper in self.scrapers.items():
+            try:
+                start_date, end_date, tail_start = scraper.tailWindow()
+                groups.setdefault((tail_start, end_date), []).append((ticker, start_date))
+            except Exception as e:
+                yield ticker, None, str(e)
+        for (tail_start, end_date), members in groups.items():
+            tickers = [ticker for ticker, _ in members]
+            try:
+                if tail_start >= end_date:
+                    tails = {ticker: StockScraper.emptyFrame()
+                             for ticker in tickers}
+                else:
+                    tails = self._downloadYfinance(tickers, tail_start, end_date)
+            except Exception as e:
+                for ticker in tickers:
+                    yield ticker, None, f"Error occured using Yfinance\n {e}"
+                continue
+            for ticker, start_date in members:
+                try:
+                    data = self.scrapers[ticker].appendTail(tails[ticker], start_date)
+                except Exception as e:
+                    yield ticker, None, str(e)
+                    continue
+                if data.empty:
+                    yield ticker, None, f"No data returned for {ticker}"
+                else:
+                    yield ticker, data, None
+
+    def _iterPooled(self):
+        with ThreadPoolExecutor(max_workers = min(self.MAX_WORKERS, len(self.scrapers))) as executor:
+            futures = {executor.submit(scraper.getFrame): ticker for ticker, scraper in self.scrapers.items()}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, str(e)
+
+    def iterFrames(self):
+        # Yields (ticker, frame, error) as soon as each ticker is ready
+        if self.api == "yfinance":
+            return self._iterYfinance()
+        return self._iterPooled()
+
+    def iterRecords(self):
+        for ticker, frame, error in self.iterFrames():
+            if error is not None:
+                yield {"ticker": ticker, "error": error}
+            else:
+                yield {"ticker": ticker, "data": FrameEncoder(frame).toColumnar()}
+
+    def getData(self):
+        data, errors = {}, {}
+        for record in self.iterRecords():
+            if "error" in record:
+                errors[record["ticker"]] = record["error"]
+            else:
+                data[record["ticker"]] = record["data"]
+        return {"data": data, "errors": errors}
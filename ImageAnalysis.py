@@ -130,3 +130,16 @@ class PatternClassifier:
             return self.content
         except Exception as e:
             raise Exception("Error retrieving content from PatternClassifier") from e
+
+CLASSIFIERS = {
+    "movement": MovementClassifier,
+    "pattern": PatternClassifier
+}
+
+def runClassifier(classifier, ticker, interval, api):
+    if classifier not in CLASSIFIERS:
+        raise Exception(f"Classifier not found: {classifier}")
+    model = CLASSIFIERS[classifier](ticker = ticker, interval = interval, api = api)
+    model.train()
+    model.classify()
+    return model.getContent()
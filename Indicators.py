@@ -0,0 +1,572 @@
+import math
+import numpy as np
+from abc import ABC, abstractmethod
+from collections import deque
+
+
+########  Batched Indicator Families  ########
+# Each kernel computes one indicator for a whole family of lengths in a single pass and returns a
+# (lengths x bars) float64 matrix, NaN where the indicator is still warming up. The input is either one series,
+# computed for every length, or a (rows x bars) panel of series (e.g. one row per ticker) with one length per row.
+# The formulas follow pandas_ta's (no TA-Lib): SMA seeded EMA, Wilder's RMA for RSI and ATR.
+
+RECURRENCE_BLOCK = 16
+
+def linearRecurrence(values, decay, gain, initial, block = RECURRENCE_BLOCK):
+    # y[:, t] = decay * y[:, t - 1] + gain * values[:, t] for every row at once, with y[:, -1] = initial.
+    # Bars are cut into blocks whose responses from a zero start come out of one batched matrix product, the
+    # value carried into each block is the same recurrence over block ends (decay ** block), solved recursively
+    rows, length = values.shape
+    decay = np.asarray(decay, dtype = float)
+    gain = np.asarray(gain, dtype = float)
+    initial = np.asarray(initial, dtype = float)
+    blocks = -(-length // block)
+    padded = np.zeros((rows, blocks * block))
+    padded[:, :length] = values
+    powers = decay[:, None] ** np.arange(block + 1)[None, :]
+    lag = np.arange(block)[:, None] - np.arange(block)[None, :]
+    kernel = np.where(lag >= 0, powers[:, np.clip(lag, 0, None)], 0.0) * gain[:, None, None]
+    local = np.matmul(padded.reshape(rows, blocks, block), kernel.transpose(0, 2, 1))
+    if blocks > 1:
+        ends = linearRecurrence(local[:, :-1, -1], powers[:, block], np.ones(rows), initial, block)
+        starts = np.concatenate([initial[:, None], ends], axis = 1)
+    else:
+        starts = initial[:, None]
+    result = local + powers[:, None, 1:] * starts[:, :, None]
+    return result.reshape(rows, -1)[:, :length]
+
+def _rows(values, lengths):
+    # One series is shared by every row without copying it
+    values = np.asarray(values, dtype = float)
+    return np.broadcast_to(values, (len(lengths), values.shape[-1]))
+
+def _lengthGroups(lengths):
+    lengths = np.asarray(lengths)
+    return [(int(length), np.flatnonzero(lengths == length)) for length in np.unique(lengths)]
+
+def smaFamily(close, lengths):
+    close = np.asarray(close, dtype = float)
+    lengths = list(lengths)
+    bars = close.shape[-1]
+    sums = np.concatenate([np.zeros(close.shape[:-1] + (1,)), np.cumsum(close, axis = -1)], axis = -1)
+    sums = _rows(sums, lengths)
+    result = np.full((len(lengths), bars), np.nan)
+    for length, rows in _lengthGroups(lengths):
+        if length <= bars:
+            result[rows, length - 1:] = (sums[rows, length:] - sums[rows, :bars - length + 1]) / length
+    return result
+
+def emaFamily(close, lengths):
+    # Rows are shifted so every length's SMA seed sits in column 0, then one recurrence runs for all of them
+    lengths = list(lengths)
+    close = _rows(close, lengths)
+    bars = close.shape[-1]
+    shifted = np.zeros((len(lengths), bars))
+    seeds = np.full(len(lengths), np.nan)
+    alphas = 2.0 / (np.asarray(lengths, dtype = float) + 1)
+    groups = [(length, rows) for length, rows in _lengthGroups(lengths) if length <= bars]
+    for length, rows in groups:
+        seeds[rows] = close[rows, :length].sum(axis = 1) / length
+        shifted[rows, :bars - length] = close[rows, length:]
+    recurrence = linearRecurrence(shifted, 1.0 - alphas, alphas, seeds)
+    result = np.full((len(lengths), bars), np.nan)
+    for length, rows in groups:
+        result[rows, length - 1] = seeds[rows]
+        result[rows, length:] = recurrence[rows, :bars - length]
+    return result
+
+def rmaFamily(values, lengths):
+    # Wilder's moving average, pandas ewm(alpha = 1 / length, adjust = True, min_periods = length) from the first
+    # valid value: a weighted sum recurrence divided by the closed form of the weights' sum. In a panel every row
+    # starts at the first bar where all rows are valid
+    lengths = list(lengths)
+    values = _rows(values, lengths)
+    bars = values.shape[-1]
+    result = np.full((len(lengths), bars), np.nan)
+    valid = np.flatnonzero(~np.isnan(values).any(axis = 0))
+    if not len(valid):
+        return result
+    first = valid[0]
+    observed = np.nan_to_num(values[:, first:])
+    alphas = 1.0 / np.asarray(lengths, dtype = float)
+    decay = 1.0 - alphas
+    weighted = linearRecurrence(observed, decay, np.ones(len(lengths)), np.zeros(len(lengths)))
+    weights = (1.0 - np.cumprod(np.repeat(decay[:, None], bars - first, axis = 1), axis = 1)) / alphas[:, None]
+    smoothed = weighted / weights
+    for length, rows in _lengthGroups(lengths):
+        if length <= bars - first:
+            result[rows, first + length - 1:] = smoothed[rows, length - 1:]
+    return result
+
+def rsiFamily(close, lengths):
+    close = np.asarray(close, dtype = float)
+    change = np.concatenate([np.full(close.shape[:-1] + (1,), np.nan), np.diff(close, axis = -1)], axis = -1)
+    positive = np.where(change < 0, 0.0, change)
+    negative = np.where(change > 0, 0.0, change)
+    positive_avg = rmaFamily(positive, lengths)
+    negative_avg = rmaFamily(negative, lengths)
+    return 100 * positive_avg / (positive_avg + np.abs(negative_avg))
+
+def nonZeroRange(high, low):
+    # pandas_ta adds an epsilon to the whole series as soon as one of its ranges is zero
+    high_low = np.asarray(high, dtype = float) - np.asarray(low, dtype = float)
+    return high_low + np.where((high_low == 0).any(axis = -1, keepdims = True), np.finfo(float).eps, 0.0)
+
+def trueRange(high, low, close):
+    high = np.asarray(high, dtype = float)
+    low = np.asarray(low, dtype = float)
+    close = np.asarray(close, dtype = float)
+    previous_close = np.concatenate([np.full(close.shape[:-1] + (1,), np.nan), close[..., :-1]], axis = -1)
+    ranges = np.fmax(np.fmax(np.abs(nonZeroRange(high, low)), np.abs(high - previous_close)),
+                     np.abs(previous_close - low))
+    ranges[..., :1] = np.nan
+    return ranges
+
+def atrFamily(high, low, close, lengths):
+    return rmaFamily(trueRange(high, low, close), lengths)
+
+def _rollingExtremeFamily(values, windows, extreme, fill):
+    # van Herk/Gil-Werman: within fixed blocks of `window` bars take running extremes forwards and backwards,
+    # every window then spans at most two blocks, so each result is the extreme of one suffix and one prefix.
+    # The vectorized counterpart of a monotonic deque, O(1) per bar independent of the window
+    windows = list(windows)
+    values = _rows(values, windows)
+    bars = values.shape[-1]
+    result = np.full((len(windows), bars), np.nan)
+    for window, rows in _lengthGroups(windows):
+        if window > bars:
+            continue
+        padded = np.concatenate([values[rows], np.full((len(rows), -bars % window), fill)], axis = 1)
+        padded = padded.reshape(len(rows), -1, window)
+        prefix = extreme.accumulate(padded, axis = 2).reshape(len(rows), -1)
+        suffix = extreme.accumulate(padded[:, :, ::-1], axis = 2)[:, :, ::-1].reshape(len(rows), -1)
+        result[rows, window - 1:] = extreme(suffix[:, :bars - window + 1], prefix[:, window - 1:bars])
+    return result
+
+def rollingMaxFamily(values, windows):
+    return _rollingExtremeFamily(values, windows, np.maximum, -np.inf)
+
+def rollingMinFamily(values, windows):
+    return _rollingExtremeFamily(values, windows, np.minimum, np.inf)
+
+
+########  Indicator Panels  ########
+# One parameter set over a (rows x bars) panel, for the indicators that combine several moving averages
+
+def macdPanel(close, fast = 12, slow = 26, signal = 9):
+    rows = len(close)
+    macd = emaFamily(close, [fast] * rows) - emaFamily(close, [slow] * rows)
+    # The signal line is an EMA of the macd line from its first valid bar
+    first = max(fast, slow) - 1
+    signal_line = np.full_like(macd, np.nan)
+    signal_line[:, first:] = emaFamily(macd[:, first:], [signal] * rows)
+    return macd, signal_line
+
+def bbandsPanel(close, length = 5, std = 2):
+    close = np.asarray(close, dtype = float)
+    mid, deviation = np.full(close.shape, np.nan), np.full(close.shape, np.nan)
+    if length <= close.shape[-1]:
+        windows = np.lib.stride_tricks.sliding_window_view(close, length, axis = -1)
+        mid[:, length - 1:] = windows.mean(axis = -1)
+        deviation[:, length - 1:] = windows.std(axis = -1)
+    return mid - std * deviation, mid, mid + std * deviation
+
+def stochPanel(high, low, close, k = 14, d = 3, smooth_k = 3):
+    close = np.asarray(close, dtype = float)
+    rows = len(close)
+    highest = rollingMaxFamily(high, [k] * rows)
+    lowest = rollingMinFamily(low, [k] * rows)
+    stoch = 100 * (close - lowest)
+    stoch[:, k - 1:] /= nonZeroRange(highest[:, k - 1:], lowest[:, k - 1:])
+    k_line, d_line = np.full(close.shape, np.nan), np.full(close.shape, np.nan)
+    k_line[:, k - 1:] = smaFamily(stoch[:, k - 1:], [smooth_k] * rows)
+    d_line[:, k + smooth_k - 2:] = smaFamily(k_line[:, k + smooth_k - 2:], [d] * rows)
+    return k_line, d_line
+
+
+########  Series Kernels  ########
+# The helpers of Strategies.py for one series: float64 arrays aligned with the input, NaN while warming up, with
+# pandas_ta's formulas but no pandas objects. Multi-line indicators reuse the panel kernels on a one row panel
+
+def _series(values):
+    return np.asarray(values, dtype = float)
+
+def smaSeries(close, length = 10):
+    close = _series(close)
+    result = np.full(len(close), np.nan)
+    if length <= len(close):
+        sums = np.cumsum(close)
+        result[length - 1] = sums[length - 1]
+        np.subtract(sums[length:], sums[:-length], out = result[length:])
+        result[length - 1:] /= length
+    return result
+
+def emaSeries(close, length = 10):
+    close = _series(close)
+    result = np.full(len(close), np.nan)
+    if length <= len(close):
+        alpha = 2.0 / (length + 1)
+        result[length - 1] = close[:length].sum() / length
+        result[length:] = linearRecurrence(close[None, length:], [1.0 - alpha], [alpha], [result[length - 1]])[0]
+    return result
+
+def rmaSeries(values, length):
+    # rmaFamily for one series: from its first valid value on
+    values = _series(values)
+    result = np.full(len(values), np.nan)
+    valid = np.flatnonzero(~np.isnan(values))
+    if not len(valid) or length > len(values) - valid[0]:
+        return result
+    first = valid[0]
+    alpha = 1.0 / length
+    weighted = linearRecurrence(np.nan_to_num(values[None, first:]), [1.0 - alpha], [1.0], [0.0])[0]
+    weights = (1.0 - np.cumprod(np.full(len(weighted), 1.0 - alpha))) / alpha
+    result[first + length - 1:] = weighted[length - 1:] / weights[length - 1:]
+    return result
+
+def rsiSeries(close, length = 14):
+    change = np.diff(_series(close), prepend = np.nan)
+    positive_avg = rmaSeries(np.where(change < 0, 0.0, change), length)
+    negative_avg = rmaSeries(np.where(change > 0, 0.0, change), length)
+    return 100 * positive_avg / (positive_avg + np.abs(negative_avg))
+
+def atrSeries(high, low, close, length = 14):
+    return rmaSeries(trueRange(high, low, close), length)
+
+def rollingMaxSeries(values, window = 10):
+    return rollingMaxFamily(values, [window])[0]
+
+def rollingMinSeries(values, window = 10):
+    return rollingMinFamily(values, [window])[0]
+
+def macdSeries(close, fast = 12, slow = 26, signal = 9):
+    macd, signal_line = macdPanel(_series(close)[None], fast, slow, signal)
+    return macd[0], signal_line[0]
+
+def bbandsSeries(close, length = 5, std = 2):
+    return tuple(band[0] for band in bbandsPanel(_series(close)[None], length, std))
+
+def stochSeries(high, low, close, k = 14, d = 3, smooth_k = 3):
+    k_line, d_line = stochPanel(_series(high)[None], _series(low)[None], _series(close)[None], k, d, smooth_k)
+    return k_line[0], d_line[0]
+
+def obvSeries(close, volume):
+    # Volume signed by the close's direction, the first bar counting as up (pandas_ta's signed_series(initial = 1)).
+    # Works along the last axis, so a panel gets one OBV per row
+    sign = np.sign(np.diff(_series(close), axis = -1, prepend = np.nan))
+    sign[..., :1] = 1.0
+    return np.cumsum(sign * _series(volume), axis = -1)
+
+########  Incremental Indicators  ########
+# Streaming counterparts of the batch helpers in Strategies.py (pandas_ta formulas) and SarimaxPredictor: update()
+# consumes one bar in O(1) and returns the latest value, NaN while warming up. State lives in __slots__ and can be
+# saved with snapshot() and rolled back with restore(), e.g. to evaluate a still forming bar and undo it.
+
+def _copyState(value):
+    if isinstance(value, IncrementalIndicator):
+        return value.snapshot()
+    if isinstance(value, deque):
+        return deque(value, value.maxlen)
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+def _divide(numerator, denominator):
+    return numerator / denominator if denominator else math.nan
+
+
+class IncrementalIndicator(ABC):
+    __slots__ = ()
+    INPUTS = ("Close",)
+
+    @abstractmethod
+    def update(self, *values):
+        pass
+
+    def updateBar(self, bar):
+        # bar is anything indexable by column name, e.g. a kline dict or a DataFrame row
+        return self.update(*(bar[name] for name in self.INPUTS))
+
+    def feed(self, *columns):
+        return [self.update(*values) for values in zip(*columns)]
+
+    @classmethod
+    def _slots(cls):
+        return [slot for klass in reversed(cls.__mro__) for slot in getattr(klass, "__slots__", ())]
+
+    def snapshot(self):
+        return tuple(_copyState(getattr(self, slot)) for slot in self._slots())
+
+    def restore(self, state):
+        for slot, value in zip(self._slots(), state):
+            current = getattr(self, slot)
+            if isinstance(current, IncrementalIndicator):
+                current.restore(value)
+            else:
+                setattr(self, slot, _copyState(value))
+        return self
+
+
+class SmaState(IncrementalIndicator):
+    __slots__ = ("length", "window", "position", "count", "total")
+
+    def __init__(self, length = 10):
+        self.length = length
+        self.window = [0.0] * length
+        self.position = 0
+        self.count = 0
+        self.total = 0.0
+
+    def update(self, value):
+        old = self.window[self.position]
+        self.window[self.position] = value
+        self.position = (self.position + 1) % self.length
+        self.count += 1
+        # The running sum is rebuilt once per lap of the window so rounding can't drift, still O(1) amortized
+        self.total = math.fsum(self.window) if self.position == 0 else self.total + value - old
+        return self.total / self.length if self.count >= self.length else math.nan
+
+
+class EmaState(IncrementalIndicator):
+    # pandas_ta's EMA: seeded with the SMA of the first `length` values
+    __slots__ = ("length", "alpha", "count", "total", "value")
+
+    def __init__(self, length = 10):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.count = 0
+        self.total = 0.0
+        self.value = math.nan
+
+    def update(self, value):
+        self.count += 1
+        if self.count < self.length:
+            self.total += value
+        elif self.count == self.length:
+            self.value = (self.total + value) / self.length
+        else:
+            self.value = (1 - self.alpha) * self.value + self.alpha * value
+        return self.value
+
+
+class RmaState(IncrementalIndicator):
+    # Wilder's moving average as pandas_ta computes it: ewm(alpha = 1 / length, adjust = True, min_periods = length)
+    __slots__ = ("length", "decay", "count", "weighted", "weight")
+
+    def __init__(self, length = 14):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.count = 0
+        self.weighted = 0.0
+        self.weight = 0.0
+
+    def update(self, value):
+        self.count += 1
+        self.weighted = value + self.decay * self.weighted
+        self.weight = 1.0 + self.decay * self.weight
+        return self.weighted / self.weight if self.count >= self.length else math.nan
+
+
+class RsiState(IncrementalIndicator):
+    __slots__ = ("previous", "gains", "losses")
+
+    def __init__(self, length = 14):
+        self.previous = None
+        self.gains = RmaState(length)
+        self.losses = RmaState(length)
+
+    def update(self, close):
+        previous, self.previous = self.previous, close
+        if previous is None:
+            return math.nan
+        change = close - previous
+        gain = self.gains.update(max(change, 0.0))
+        loss = abs(self.losses.update(min(change, 0.0)))
+        return _divide(100 * gain, gain + loss)
+
+
+class AtrState(IncrementalIndicator):
+    INPUTS = ("High", "Low", "Close")
+    __slots__ = ("previous", "average")
+
+    def __init__(self, length = 14):
+        self.previous = None
+        self.average = RmaState(length)
+
+    def update(self, high, low, close):
+        previous, self.previous = self.previous, close
+        if previous is None:
+            return math.nan
+        true_range = max(abs(high - low), abs(high - previous), abs(previous - low))
+        return self.average.update(true_range)
+
+
+class MacdState(IncrementalIndicator):
+    # (macd line, signal line), the signal is an EMA of the macd line from its first valid value
+    __slots__ = ("fast", "slow", "signal")
+
+    def __init__(self, fast = 12, slow = 26, signal = 9):
+        self.fast = EmaState(fast)
+        self.slow = EmaState(slow)
+        self.signal = EmaState(signal)
+
+    def update(self, close):
+        fast = self.fast.update(close)
+        slow = self.slow.update(close)
+        if math.isnan(fast) or math.isnan(slow):
+            return math.nan, math.nan
+        macd = fast - slow
+        return macd, self.signal.update(macd)
+
+
+class BbandsState(IncrementalIndicator):
+    # (lower, mid, upper) bands around the SMA, population standard deviation like pandas_ta
+    __slots__ = ("length", "std", "window", "position", "count", "mean", "m2")
+
+    def __init__(self, length = 5, std = 2):
+        self.length = length
+        self.std = std
+        self.window = [0.0] * length
+        self.position = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, value):
+        old = self.window[self.position]
+        self.window[self.position] = value
+        self.position = (self.position + 1) % self.length
+        self.count += 1
+        if self.position == 0:
+            self.mean = math.fsum(self.window) / self.length
+            self.m2 = math.fsum((item - self.mean) ** 2 for item in self.window)
+        elif self.count <= self.length:
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+        else:
+            # Welford's update for a sliding window: the new value replaces the oldest one
+            delta = value - old
+            old_mean = self.mean
+            self.mean += delta / self.length
+            self.m2 += delta * (value - self.mean + old - old_mean)
+        if self.count < self.length:
+            return math.nan, math.nan, math.nan
+        deviation = self.std * math.sqrt(max(self.m2, 0.0) / self.length)
+        return self.mean - deviation, self.mean, self.mean + deviation
+
+
+class RollingExtremeState(IncrementalIndicator):
+    # Monotonic deque of (bar, value): the front is the window's extreme, values it dominates are dropped on arrival
+    __slots__ = ("window", "count", "candidates")
+    SIGN = 1
+
+    def __init__(self, window = 10):
+        self.window = window
+        self.count = 0
+        self.candidates = deque()
+
+    def update(self, value):
+        candidates = self.candidates
+        while candidates and self.SIGN * candidates[-1][1] <= self.SIGN * value:
+            candidates.pop()
+        candidates.append((self.count, value))
+        if candidates[0][0] <= self.count - self.window:
+            candidates.popleft()
+        self.count += 1
+        return candidates[0][1] if self.count >= self.window else math.nan
+
+
+class RollingMaxState(RollingExtremeState):
+    __slots__ = ()
+    INPUTS = ("High",)
+    SIGN = 1
+
+
+class RollingMinState(RollingExtremeState):
+    __slots__ = ()
+    INPUTS = ("Low",)
+    SIGN = -1
+
+
+class StochState(IncrementalIndicator):
+    # (%K, %D): the raw stochastic smoothed by an SMA of smooth_k, %D is an SMA of %K
+    INPUTS = ("High", "Low", "Close")
+    __slots__ = ("highs", "lows", "k_line", "d_line")
+
+    def __init__(self, k = 14, d = 3, smooth_k = 3):
+        self.highs = RollingMaxState(k)
+        self.lows = RollingMinState(k)
+        self.k_line = SmaState(smooth_k)
+        self.d_line = SmaState(d)
+
+    def update(self, high, low, close):
+        highest = self.highs.update(high)
+        lowest = self.lows.update(low)
+        if math.isnan(highest) or math.isnan(lowest):
+            return math.nan, math.nan
+        k_value = self.k_line.update(100 * (close - lowest) / ((highest - lowest) or np.finfo(float).eps))
+        if math.isnan(k_value):
+            return math.nan, math.nan
+        return k_value, self.d_line.update(k_value)
+
+
+class EwmState(IncrementalIndicator):
+    # pandas ewm(span, adjust = False).mean(), seeded with the first value (SarimaxPredictor._ema)
+    __slots__ = ("alpha", "value")
+
+    def __init__(self, span = 20):
+        self.alpha = 2.0 / (span + 1)
+        self.value = None
+
+    def update(self, value):
+        self.value = value if self.value is None else (1 - self.alpha) * self.value + self.alpha * value
+        return self.value
+
+
+class RollingRsiState(IncrementalIndicator):
+    # RSI over simple rolling means of gains and losses (SarimaxPredictor._rsi)
+    __slots__ = ("previous", "gains", "losses")
+
+    def __init__(self, period = 14):
+        self.previous = None
+        self.gains = SmaState(period)
+        self.losses = SmaState(period)
+
+    def update(self, close):
+        previous, self.previous = self.previous, close
+        if previous is None:
+            return math.nan
+        change = close - previous
+        gain = self.gains.update(max(change, 0.0))
+        loss = abs(self.losses.update(min(change, 0.0)))
+        if math.isnan(gain) or math.isnan(loss) or gain == loss == 0:
+            return math.nan
+        return 100.0 if loss == 0 else 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+class EwmMacdState(IncrementalIndicator):
+    # MACD line of two first-value seeded EMAs (SarimaxPredictor._macd)
+    __slots__ = ("fast", "slow")
+
+    def __init__(self, fast_period = 12, slow_period = 26):
+        self.fast = EwmState(fast_period)
+        self.slow = EwmState(slow_period)
+
+    def update(self, close):
+        return self.fast.update(close) - self.slow.update(close)
+
+
+class ObvState(IncrementalIndicator):
+    INPUTS = ("Close", "Volume")
+    __slots__ = ("previous", "total")
+
+    def __init__(self):
+        self.previous = None
+        self.total = 0.0
+
+    def update(self, close, volume):
+        if self.previous is not None:
+            self.total += volume if close > self.previous else -volume if close < self.previous else 0
+        self.previous = close
+        return self.total
@@ -0,0 +1,121 @@
+import os
+import time
+import uuid
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+class JobManager:
+    MAX_WORKERS = int(os.environ.get("JOB_WORKERS", max((os.cpu_count() or 2) - 1, 1)))
+    RESULT_TTL = int(os.environ.get("JOB_RESULT_TTL", 3600))
+
+    def __init__(self, max_workers = None, result_ttl = None):
+        self.max_workers = max_workers or self.MAX_WORKERS
+        self.result_ttl = self.RESULT_TTL if result_ttl is None else result_ttl
+        self._executor = None
+        self._jobs = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _getExecutor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn keeps workers clear of the server's threads (streams, thread pool) that fork would copy
+                self._executor = ProcessPoolExecutor(max_workers = self.max_workers,
+                                                     mp_context = multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def _purge(self):
+        now = time.time()
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job["finished"] is not None and now - job["finished"] > self.result_ttl]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def _finish(self, job_id):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id]["finished"] = time.time()
+
+    def _submitShared(self, kind, fn, *args):
+        # Identical calls (same kind, function and arguments, e.g. ticker, interval and api) that arrive while one is
+        # still running share its future, since the workers are separate processes whose in-memory caches and
+        # single-flight fetches cannot see each other
+        key = (kind, fn.__module__, fn.__qualname__, repr(args))
+        executor = self._getExecutor()
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            try:
+                future = executor.submit(fn, *args)
+            except Exception as e:
+                raise Exception(f"Error submitting {kind} job\n {e}")
+            self._inflight[key] = future
+        future.add_done_callback(lambda _: self._release(key, future))
+        return future
+
+    def _release(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def submit(self, kind, fn, *args, media_type = "application/json"):
+        self._purge()
+        future = self._submitShared(kind, fn, *args)
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                "kind": kind,
+                "submitted": time.time(),
+                "finished": None,
+                "future": future,
+                "media_type": media_type
+            }
+        future.add_done_callback(lambda _: self._finish(job_id))
+        return self.status(job_id)
+
+    async def run(self, kind, fn, *args):
+        # Runs a job in the process pool without blocking the event loop or registering it for polling
+        return await asyncio.wrap_future(self._submitShared(kind, fn, *args))
+
+    def _get(self, job_id):
+        self._purge()
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job
+
+    def status(self, job_id):
+        job = self._get(job_id)
+        future = job["future"]
+        if not future.done():
+            state = "running" if future.running() else "queued"
+        elif future.cancelled() or future.exception() is not None:
+            state = "failed"
+        else:
+            state = "done"
+        return {
+            "job_id": job_id,
+            "kind": job["kind"],
+            "status": state,
+            "submitted": job["submitted"],
+            "finished": job["finished"],
+            "error": str(future.exception()) if state == "failed" and not future.cancelled() else None
+        }
+
+    def result(self, job_id):
+        job = self._get(job_id)
+        if not job["future"].done():
+            raise Exception(f"Job {job_id} has not finished yet")
+        return job["future"].result(), job["media_type"]
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait = False, cancel_futures = True)
@@ -0,0 +1,356 @@
+import os
+import math
+import time
+import random
+import itertools
+import contextlib
+import multiprocessing
+import numpy as np
+import pandas as pd
+from types import SimpleNamespace
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+
+
+def parameterGrid(params, constraint = None, max_tries = None, random_state = None):
+    # Every admissible combination of the parameter ranges, or a random sample of max_tries of them
+    names = list(params)
+    grid = [dict(zip(names, values)) for values in itertools.product(*(list(params[name]) for name in names))]
+    if constraint is not None:
+        grid = [combination for combination in grid if constraint(SimpleNamespace(**combination))]
+    if not grid:
+        raise ValueError("No admissible parameter combinations to test")
+    if max_tries is not None and len(grid) > max_tries:
+        grid = random.Random(random_state).sample(grid, max_tries)
+    return grid
+
+def sampleGrid(params, count, constraint = None, random_state = None):
+    # Up to `count` distinct admissible combinations drawn uniformly, without listing grids too large to hold in memory
+    names = list(params)
+    options = [list(params[name]) for name in names]
+    size = math.prod(len(values) for values in options)
+    if size <= max(count * 4, 100_000):
+        return parameterGrid(params, constraint, count, random_state)
+    generator = random.Random(random_state)
+    seen, grid = set(), []
+    for _ in range(count * 20):
+        if len(grid) >= count:
+            break
+        index = generator.randrange(size)
+        if index in seen:
+            continue
+        seen.add(index)
+        combination = {}
+        for name, values in zip(reversed(names), reversed(options)):
+            index, position = divmod(index, len(values))
+            combination[name] = values[position]
+        combination = {name: combination[name] for name in names}
+        if constraint is None or constraint(SimpleNamespace(**combination)):
+            grid.append(combination)
+    if not grid:
+        raise ValueError("No admissible parameter combinations to test")
+    return grid
+
+def scalarStats(stats):
+    return {key: value for key, value in stats.items() if not key.startswith("_")}
+
+def bestRecord(records, maximize):
+    # First record with the highest value, NaN (e.g. the win rate of a run without trades) never wins
+    scored = [record for record in records if not np.isnan(record[maximize])]
+    return max(scored, key = lambda record: record[maximize]) if scored else records[0]
+
+def topRecords(records, maximize, k):
+    # The k best records for one objective, NaN never ranks
+    scored = [record for record in records if not np.isnan(record[maximize])]
+    return sorted(scored, key = lambda record: record[maximize], reverse = True)[:k]
+
+def paretoFront(records, objectives = ("Equity Final [$]", "Win Rate [%]")):
+    # Records no other record beats on every objective, sorted by the first objective
+    first, second = objectives
+    candidates = sorted((record for record in records if not np.isnan(record[first]) and not np.isnan(record[second])),
+                        key = lambda record: (-record[first], -record[second]))
+    front, best_second = [], -np.inf
+    for record in candidates:
+        if record[second] > best_second:
+            front.append(record)
+            best_second = record[second]
+    return front
+
+def walkForwardFolds(length, folds, train_fraction = 0.7):
+    # Rolling (train_start, test_start, test_end) bar ranges: the first train_fraction of the bars trains the first
+    # fold, the rest is cut into `folds` consecutive test windows, each trained on the same number of bars before it
+    if folds < 1 or not 0 < train_fraction < 1:
+        raise ValueError("Walk forward needs at least one fold and a train fraction between 0 and 1")
+    train = int(length * train_fraction)
+    test = (length - train) // folds
+    if train < 2 or test < 1:
+        raise ValueError(f"{length} bars are too few for {folds} walk forward folds")
+    bounds = [train + fold * test for fold in range(folds)] + [length]
+    return [(test_start - train, test_start, test_end) for test_start, test_end in zip(bounds, bounds[1:])]
+
+
+class SharedFrame:
+    # OHLCV bars in one shared memory block, so pool workers map the data instead of unpickling it per task
+    COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+    def __init__(self, name, length, tz = None):
+        self.name = name
+        self.length = length
+        self.tz = tz
+        self._memory = None
+
+    @classmethod
+    def create(cls, data):
+        length = len(data)
+        memory = shared_memory.SharedMemory(create = True, size = max(length * (len(cls.COLUMNS) + 1) * 8, 1))
+        frame = cls(memory.name, length, str(data.index.tz) if data.index.tz is not None else None)
+        frame._memory = memory
+        values, index = frame._arrays()
+        values[:] = data[cls.COLUMNS].to_numpy(dtype = float)
+        index[:] = data.index.asi8
+        return frame
+
+    def _arrays(self):
+        buffer = self._memory.buf
+        values = np.ndarray((self.length, len(self.COLUMNS)), dtype = float, buffer = buffer)
+        index = np.ndarray((self.length,), dtype = np.int64, buffer = buffer, offset = values.nbytes)
+        return values, index
+
+    def __getstate__(self):
+        return {"name": self.name, "length": self.length, "tz": self.tz}
+
+    def __setstate__(self, state):
+        self.__init__(state["name"], state["length"], state["tz"])
+
+    def toFrame(self):
+        attached = self._memory is None
+        if attached:
+            self._memory = shared_memory.SharedMemory(name = self.name)
+        values, index = self._arrays()
+        index = pd.DatetimeIndex(index.copy(), name = 'Date')
+        if self.tz:
+            index = index.tz_localize("UTC").tz_convert(self.tz)
+        data = pd.DataFrame(values.copy(), columns = self.COLUMNS, index = index)
+        if attached:
+            del values
+            self.close()
+        return data
+
+    def close(self, unlink = False):
+        if self._memory is not None:
+            self._memory.close()
+            if unlink:
+                self._memory.unlink()
+            self._memory = None
+
+
+_worker_data = None
+_worker_setup = None
+_worker_backtest = None
+
+def _initSweepWorker(frame, engine, strategy, cash, prepare, params):
+    global _worker_data, _worker_setup, _worker_backtest
+    _worker_data = frame.toFrame()
+    _worker_setup = (engine, strategy, cash, prepare, params)
+    _worker_backtest = None
+
+def sliceBacktest(data, length, engine, strategy, cash, prepare, params):
+    # A backtest on the trailing `length` bars (all of them when None), caches warmed for that slice
+    data = data.iloc[-length:] if length else data
+    if prepare is not None:
+        prepare(data, strategy, params)
+    return length, engine(data, strategy, cash = cash)
+
+def evaluateCombinations(backtest, combinations):
+    records, errors = [], []
+    for combination in combinations:
+        try:
+            # VectorBacktest can skip building the trade log and equity frames nobody looks at here
+            summary = (backtest.summarize(**combination) if hasattr(backtest, "summarize")
+                       else scalarStats(backtest.run(**combination)))
+        except Exception as e:
+            errors.append(f"{combination}: {e}")
+            continue
+        records.append({"params": combination, **summary})
+    return records, errors
+
+def _evaluateChunk(combinations, length = None):
+    global _worker_backtest
+    # A worker keeps the backtest of the slice it last ran on, the halving rungs move to a longer one in turn
+    if _worker_backtest is None or _worker_backtest[0] != length:
+        _worker_backtest = None
+        _worker_backtest = sliceBacktest(_worker_data, length, *_worker_setup)
+    started = time.perf_counter()
+    records, errors = evaluateCombinations(_worker_backtest[1], combinations)
+    return records, errors, time.perf_counter() - started
+
+
+class ParameterSweep:
+    """
+        Runs every parameter combination once and keeps the scalar stats of each run, so any number of objectives
+        can be picked from a single pass. Large sweeps are split over a spawn process pool whose workers read the
+        OHLCV bars from shared memory. The pool can be opened once and passed to several evaluate() calls, which
+        then pay the process spawn and the workers' cache warm-up only once.
+    """
+    MAX_WORKERS = int(os.environ.get("SWEEP_WORKERS", os.cpu_count() or 1))
+    MAX_TRIES = int(os.environ.get("SWEEP_MAX_TRIES", 2000))
+    MIN_PARALLEL = 64
+
+    def __init__(self, data, strategy, engine, cash = 10_000, max_workers = None, prepare = None):
+        # prepare(data, strategy, params) runs once in every worker before its first task on a slice, e.g. to warm
+        # caches
+        self.data = data
+        self.strategy = strategy
+        self.engine = engine
+        self.cash = cash
+        self.prepare = prepare
+        self.max_workers = max_workers or self.MAX_WORKERS
+        self.errors = []
+        # Time the last evaluate() spent running combinations, spread over the workers, without the pool's startup
+        self.seconds = 0.0
+        self._backtest = None
+
+    def run(self, constraint = None, max_tries = None, random_state = 0, **params):
+        grid = parameterGrid(params, constraint, max_tries or self.MAX_TRIES, random_state)
+        with self.pool(params, len(grid)) as executor:
+            return self.evaluate(grid, params, executor)
+
+    @contextlib.contextmanager
+    def pool(self, params = None, size = None):
+        # A spawn process pool over the bars in shared memory, or None when `size` combinations are too few for one
+        if self.max_workers <= 1 or (size is not None and size < self.MIN_PARALLEL):
+            yield None
+            return
+        frame = SharedFrame.create(self.data)
+        try:
+            with ProcessPoolExecutor(max_workers = self.max_workers,
+                                     mp_context = multiprocessing.get_context("spawn"),
+                                     initializer = _initSweepWorker,
+                                     initargs = (frame, self.engine, self.strategy, self.cash, self.prepare,
+                                                 params or {})) as executor:
+                yield executor
+        finally:
+            frame.close(unlink = True)
+
+    def evaluate(self, grid, params = None, executor = None, length = None):
+        # Scores the given combinations on the trailing `length` bars (all when None), params are the ranges they
+        # were drawn from as the prepare hook expects them
+        params = params or {}
+        if executor is None:
+            if self._backtest is None or self._backtest[0] != length:
+                self._backtest = None
+                self._backtest = sliceBacktest(self.data, length, self.engine, self.strategy, self.cash,
+                                               self.prepare, params)
+            started = time.perf_counter()
+            records, self.errors = evaluateCombinations(self._backtest[1], grid)
+            self.seconds = time.perf_counter() - started
+            return records
+
+        chunk_size = math.ceil(len(grid) / (self.max_workers * 4))
+        chunks = [grid[start:start + chunk_size] for start in range(0, len(grid), chunk_size)]
+        try:
+            results = list(executor.map(_evaluateChunk, chunks, [length] * len(chunks)))
+        except Exception as e:
+            raise Exception(f"Error running parameter sweep\n {e}")
+        records = [record for chunk_records, _, _ in results for record in chunk_records]
+        self.errors = [error for _, chunk_errors, _ in results for error in chunk_errors]
+        self.seconds = sum(seconds for _, _, seconds in results) / min(self.max_workers, len(chunks))
+        return records
+
+
+class SuccessiveHalving:
+    """
+        Budgeted search for grids too large to run in full. A random sample of combinations is scored on only the
+        most recent bars, then every rung keeps the best 1/eta of them for a slice eta times longer, until the last
+        rung runs the survivors on all bars. The number of combinations sampled is sized so all rungs together stay
+        within max_evals runs. With max_seconds the sample is cut to what the pace of the first runs fits into that
+        time, and no new chunk of runs starts once it has passed.
+    """
+    ETA = int(os.environ.get("HALVING_ETA", 3))
+    MAX_EVALS = int(os.environ.get("HALVING_MAX_EVALS", 2000))
+    MIN_BARS = int(os.environ.get("HALVING_MIN_BARS", 250))
+    CHUNK = 256
+
+    def __init__(self, data, strategy, engine, cash = 10_000, eta = None, min_bars = None, max_workers = None,
+                 prepare = None):
+        self.data = data
+        self.strategy = strategy
+        self.engine = engine
+        self.cash = cash
+        self.eta = max(eta or self.ETA, 2)
+        self.min_bars = min_bars or self.MIN_BARS
+        self.max_workers = max_workers
+        self.prepare = prepare
+        self.errors = []
+        self.report = {}
+
+    def rungLengths(self):
+        # Trailing slice lengths from the shortest up to all bars
+        lengths = [len(self.data)]
+        while lengths[0] // self.eta >= self.min_bars:
+            lengths.insert(0, lengths[0] // self.eta)
+        return lengths
+
+    def promote(self, records, objectives, keep):
+        # Takes the best records of each objective in turn, so both objectives keep their leaders
+        rankings = [topRecords(records, maximize, len(records)) for maximize in objectives]
+        promoted = []
+        for rank in range(len(records)):
+            for ranking in rankings:
+                if len(promoted) >= keep:
+                    return promoted
+                if rank < len(ranking) and ranking[rank]["params"] not in promoted:
+                    promoted.append(ranking[rank]["params"])
+        return promoted
+
+    def run(self, objectives, constraint = None, max_evals = None, max_seconds = None, random_state = 0, **params):
+        started = time.perf_counter()
+        max_evals = max_evals or self.MAX_EVALS
+        lengths = self.rungLengths()
+        # Sized so that n + n/eta + n/eta^2 + ... fits the evaluation budget
+        count = max(int(max_evals / sum(self.eta ** -rung for rung in range(len(lengths)))), 1)
+        candidates = sampleGrid(params, count, constraint, random_state)
+        lengths = lengths[-max(math.ceil(math.log(len(candidates), self.eta)) + 1, 1):]
+        evaluations, rungs, records, self.errors = 0, [], [], []
+        out_of_budget = False
+        # One pool for every rung, workers build the backtest of each rung's slice from the same shared bars
+        sweep = ParameterSweep(self.data, self.strategy, self.engine, cash = self.cash, max_workers = self.max_workers,
+                               prepare = self.prepare)
+        with sweep.pool(params, len(candidates)) as executor:
+            for rung, length in enumerate(lengths):
+                if rung:
+                    candidates = self.promote(records, objectives, max(math.ceil(len(candidates) / self.eta), 1))
+                rung_records, start = [], 0
+                while start < len(candidates):
+                    chunk = candidates[start:start + self.CHUNK][:max_evals - evaluations]
+                    if not chunk or (max_seconds is not None and time.perf_counter() - started > max_seconds):
+                        out_of_budget = True
+                        break
+                    rung_records += sweep.evaluate(chunk, params, executor, length)
+                    self.errors += sweep.errors
+                    evaluations += len(chunk)
+                    if max_seconds is not None and not rung and not start:
+                        # Every rung costs about as much as the first (eta times fewer runs on eta times more bars),
+                        # so the first chunk's pace, without the pool's startup, tells how many combinations the
+                        # rest of the time budget can carry through all rungs
+                        pace = sweep.seconds / len(chunk)
+                        remaining = max_seconds - (time.perf_counter() - started)
+                        candidates = candidates[:max(int(remaining / (pace * len(lengths))) + len(chunk),
+                                                     len(chunk))]
+                    start += len(chunk)
+                rungs.append({"bars": length, "candidates": len(candidates), "scored": len(rung_records)})
+                if not rung_records:
+                    break
+                # Survivors are scored best first, so even an interrupted rung holds the leaders of the one before it
+                records = rung_records
+                if out_of_budget:
+                    break
+        self.report = {
+            "evaluations": evaluations,
+            "max_evals": max_evals,
+            "seconds": time.perf_counter() - started,
+            "max_seconds": max_seconds,
+            "complete": not out_of_budget and len(rungs) == len(lengths) and rungs[-1]["scored"] > 0,
+            "rungs": rungs
+        }
+        return records
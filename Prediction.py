@@ -1,4 +1,9 @@
 import os
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
@@ -10,7 +15,31 @@ from statsmodels.tsa.statespace.sarimax import SARIMAX
 
 from DataManagement import StockScraper
 
+class StateSpaceUpdates:
+    # update/refilter of the statsmodels predictors: the fitted results are extended by new bars or run over the
+    # whole current frame again, both with the parameters already estimated
+    ENDOG = 'Close'
+    EXOG = None
+
+    def _exog(self, df):
+        return df[self.EXOG] if self.EXOG else None
+
+    def update(self, fitted, new_df):
+        try:
+            return fitted.append(new_df[self.ENDOG] if self.EXOG else new_df, exog = self._exog(new_df))
+        except Exception as e:
+            raise Exception(f"Error updating {type(self).__name__} model") from e
+
+    def refilter(self, fitted):
+        try:
+            return fitted.apply(self.df[self.ENDOG] if self.EXOG else self.df, exog = self._exog(self.df))
+        except Exception as e:
+            raise Exception(f"Error updating {type(self).__name__} model") from e
+
+
 class FbProphetPredictor:
+    # The column the model registry lines up cached and current bars on
+    ENDOG = 'y'
     
     def __init__(self, ticker, interval, api, days_ahead):
         try:
@@ -44,6 +73,22 @@ class FbProphetPredictor:
         except Exception as e:
             raise Exception("Error training Prophet model") from e
 
+    @staticmethod
+    def _warmStart(fitted):
+        # Point estimates of a fitted model, the optimizer's starting point for the next fit
+        return {**{name: fitted.params[name][0][0] for name in ['k', 'm', 'sigma_obs']},
+                **{name: fitted.params[name][0] for name in ['delta', 'beta']}}
+
+    def update(self, fitted, new_df):
+        # Prophet has no state to extend, the refit over all bars starts from the previous optimum instead
+        return self.refilter(fitted)
+
+    def refilter(self, fitted):
+        try:
+            return Prophet(daily_seasonality=True).fit(self.df, init=self._warmStart(fitted))
+        except Exception as e:
+            raise Exception("Error updating Prophet model") from e
+
     def forecast(self):
         try:
             future = self.fitted.make_future_dataframe(self.days_ahead)
@@ -64,7 +109,7 @@ class FbProphetPredictor:
             raise Exception("Error retrieving forecast data from FbProphetPredictor") from e
 
 
-class ArimaPredictor:
+class ArimaPredictor(StateSpaceUpdates):
 
     def __init__(self, ticker, interval, api, days_ahead):
         try:
@@ -114,7 +159,7 @@ class ArimaPredictor:
         except Exception as e:
             raise Exception("Error retrieving forecast data from ArimaPredictor") from e
 
-class SarimaPredictor:
+class SarimaPredictor(StateSpaceUpdates):
 
     def __init__(self, ticker, interval, api, days_ahead):
         try:
@@ -165,7 +210,8 @@ class SarimaPredictor:
             raise Exception("Error retrieving forecast data from SarimaPredictor") from e
 
 
-class SarimaxPredictor:
+class SarimaxPredictor(StateSpaceUpdates):
+    EXOG = ['ema_100', 'rsi', 'macd', 'obv']
 
     def __init__(self, ticker, interval, api, days_ahead):
         try:
@@ -252,7 +298,7 @@ class SarimaxPredictor:
             self.fitted = model.fit(maxiter = 1000, method = "powell")
         except Exception as e:
             raise Exception("Error training SARIMAX model") from e
-    
+
     def forecast(self):
         try:
             forecast_dates = pd.date_range(start=self.df.index[-1] + timedelta(days=1), periods=self.days_ahead)
@@ -278,4 +324,143 @@ PREDICTORS = {
     "arima": ArimaPredictor,
     "sarima": SarimaPredictor,
     "sarimax": SarimaxPredictor
-}
\ No newline at end of file
+}
+
+
+class ModelRegistry:
+    """
+        Fitted models per (predictor, ticker, interval, api), stored with the timestamps and row hashes of the training
+        bars they have seen and evicted least recently used beyond MAX_BYTES. Cached and current bars are lined up by
+        timestamp: when only new bars arrived after an unchanged window the model is extended with its estimated
+        parameters (statsmodels append, a warm started Prophet), and when the window slid forward, the last bar was
+        revised or features computed from the window's start changed, all bars are filtered again with them.
+        Parameters are re-estimated on a cold start, or once REFIT_FRACTION of the bars are newer than the last full
+        fit or it is older than REFIT_SECONDS.
+    """
+    REGISTRY_PATH = os.environ.get("MODEL_REGISTRY_PATH", "model_registry.sqlite")
+    MAX_BYTES = int(os.environ.get("MODEL_REGISTRY_BYTES", 512 * 1024 * 1024))
+    REFIT_FRACTION = float(os.environ.get("MODEL_REFIT_FRACTION", 0.1))
+    REFIT_SECONDS = int(os.environ.get("MODEL_REFIT_SECONDS", 7 * 24 * 3600))
+
+    def __init__(self, path = None):
+        self.path = path or self.REGISTRY_PATH
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout = 30, check_same_thread = False)
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS fitted_models (
+                key TEXT PRIMARY KEY, fitted_bars INTEGER, fitted_until INTEGER, fitted_at INTEGER, times BLOB,
+                hashes BLOB, endog_hashes BLOB, used INTEGER, size INTEGER, model BLOB)""")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def key(predictor, ticker, interval, api):
+        return hashlib.sha1(f"{predictor}|{ticker}|{interval}|{api}".encode()).hexdigest()
+
+    @staticmethod
+    def barTimes(df):
+        # Every predictor's training frame, whatever its index (Prophet keeps dates in a column)
+        return pd.DatetimeIndex(df['ds'] if 'ds' in df else df.index).asi8
+
+    @staticmethod
+    def rowHashes(df):
+        return pd.util.hash_pandas_object(df, index = False).to_numpy()
+
+    def get(self, key):
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT fitted_bars, fitted_until, fitted_at, times, hashes, endog_hashes, model "
+                               "FROM fitted_models WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE fitted_models SET used = ? WHERE key = ?", (time.time_ns(), key))
+            conn.commit()
+        return {"fitted_bars": row[0], "fitted_until": row[1], "fitted_at": row[2],
+                "times": np.frombuffer(row[3], dtype = np.int64), "hashes": np.frombuffer(row[4], dtype = np.uint64),
+                "endog_hashes": np.frombuffer(row[5], dtype = np.uint64), "model": pickle.loads(row[6])}
+
+    def put(self, key, df, endog, fitted_bars, fitted_until, fitted_at, model):
+        blob = pickle.dumps(model, protocol = pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.MAX_BYTES:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO fitted_models VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         (key, fitted_bars, int(fitted_until), fitted_at, self.barTimes(df).tobytes(),
+                          self.rowHashes(df).tobytes(), self.rowHashes(df[endog]).tobytes(), time.time_ns(),
+                          len(blob), blob))
+            # Least recently used models go first once the registry outgrows its budget
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM fitted_models").fetchone()[0]
+            for evicted, size in conn.execute("SELECT key, size FROM fitted_models ORDER BY used").fetchall():
+                if total <= self.MAX_BYTES:
+                    break
+                conn.execute("DELETE FROM fitted_models WHERE key = ?", (evicted,))
+                total -= size
+            conn.commit()
+
+    def newBars(self, df, after):
+        return int(np.count_nonzero(self.barTimes(df) > after))
+
+    def status(self, entry, df, endog):
+        if entry is None:
+            return "cold"
+        times = self.barTimes(df)
+        hashes = self.rowHashes(df)
+        if np.array_equal(times, entry["times"]) and np.array_equal(hashes, entry["hashes"]):
+            return "hit"
+        if (self.newBars(df, entry["fitted_until"]) > self.REFIT_FRACTION * entry["fitted_bars"] or
+                time.time() - entry["fitted_at"] > self.REFIT_SECONDS):
+            return "refit"
+        # Locate the current window's first bar among the cached ones, the bars both share must line up one to one
+        start = np.searchsorted(entry["times"], times[0]) if len(times) else len(entry["times"])
+        shared = len(entry["times"]) - start
+        if shared < 2 or shared > len(times) or not np.array_equal(times[:shared], entry["times"][start:]):
+            return "cold"
+        if start == 0 and len(times) > shared and np.array_equal(hashes[:shared], entry["hashes"]):
+            return "append"
+        # Features computed from the window's start (an EMA, a running OBV) change when it slides, the series the
+        # model predicts must not, apart from the last cached bar that may still have been forming
+        if np.array_equal(self.rowHashes(df[endog])[:shared - 1], entry["endog_hashes"][start:-1]):
+            return "revise"
+        return "cold"
+
+    def train(self, predictor, model, ticker, interval, api, use_cache = True):
+        # Gives model its fitted results the cheapest way the registry allows
+        key = self.key(predictor, ticker, interval, api)
+        entry = self.get(key) if use_cache else None
+        status = self.status(entry, model.df, model.ENDOG)
+        if status == "hit":
+            model.fitted = entry["model"]
+        elif status == "append":
+            model.fitted = model.update(entry["model"], model.df.iloc[len(entry["times"]):])
+        elif status == "revise":
+            model.fitted = model.refilter(entry["model"])
+        else:
+            model.train()
+        if status in ("hit", "append", "revise"):
+            fitted_bars, fitted_until, fitted_at = entry["fitted_bars"], entry["fitted_until"], entry["fitted_at"]
+        else:
+            fitted_bars, fitted_until, fitted_at = len(model.df), self.barTimes(model.df)[-1], int(time.time())
+        if status != "hit":
+            self.put(key, model.df, model.ENDOG, fitted_bars, fitted_until, fitted_at, model.fitted)
+        return {
+            "status": status,
+            "bars": len(model.df),
+            "new_bars": self.newBars(model.df, entry["times"][-1]) if status in ("append", "revise") else 0,
+            "fitted_bars": fitted_bars
+        }
+
+MODEL_REGISTRY = ModelRegistry()
+
+def runPrediction(predictor, ticker, interval, api, days_ahead, use_cache = True):
+    if predictor not in PREDICTORS:
+        raise Exception(f"Predictor not found: {predictor}")
+    model = PREDICTORS[predictor](ticker=ticker, interval=interval, api=api, days_ahead=days_ahead)
+    cache = MODEL_REGISTRY.train(predictor, model, ticker, interval, api, use_cache)
+    model.forecast()
+    results = model.getData()
+    results["cache"] = cache
+    return results
@@ -1,46 +1,228 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import functools
+import threading
+import multiprocessing
 import numpy as np
 import pandas as pd
-import pandas_ta as ta
+from inspect import signature
+from types import SimpleNamespace
+from collections import OrderedDict
 from backtesting import Backtest, Strategy
+from concurrent.futures import ProcessPoolExecutor
 
+from DataManagement import BatchStockScraper, FrameEncoder, StockScraper, lttbIndices
+from Indicators import (smaFamily, emaFamily, rsiFamily, atrFamily, rollingMaxFamily, rollingMinFamily, macdPanel,
+                        bbandsPanel, stochPanel, smaSeries, emaSeries, rsiSeries, atrSeries, rollingMaxSeries,
+                        rollingMinSeries, macdSeries, bbandsSeries, stochSeries, obvSeries)
+from VectorBacktest import Signals, VectorBacktest, strategyParams
+from Optimization import (ParameterSweep, SharedFrame, SuccessiveHalving, bestRecord, evaluateCombinations,
+                          paretoFront, topRecords, walkForwardFolds)
+
+class IndicatorCache:
+    # Indicator results keyed by (function, fingerprint of the input series, parameters), shared across every
+    # Strategy.init() of an optimization run and across runs on the same data, evicted least recently used
+    MAX_BYTES = int(os.environ.get("INDICATOR_CACHE_BYTES", 256 * 1024 * 1024))
+
+    def __init__(self, max_bytes = None):
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _valueBytes(values):
+        if isinstance(values, pd.DatetimeIndex):
+            values = values.asi8
+        values = np.asarray(values)
+        if values.dtype == object:
+            return pd.util.hash_pandas_object(pd.Index(values), index = False).to_numpy().tobytes()
+        if values.dtype.kind in "mM":
+            values = values.view("i8")
+        return np.ascontiguousarray(values).tobytes()
+
+    @classmethod
+    def fingerprint(cls, value):
+        digest = hashlib.blake2b(digest_size = 16)
+        digest.update(str(np.shape(value)).encode())
+        if isinstance(value, (pd.Series, pd.DataFrame)):
+            digest.update(cls._valueBytes(value.index))
+            digest.update(cls._valueBytes(value.to_numpy()))
+        else:
+            digest.update(cls._valueBytes(value))
+        return digest.hexdigest()
+
+    def key(self, name, args):
+        return (name,) + tuple(self.fingerprint(arg) if isinstance(arg, (pd.Series, pd.DataFrame, pd.Index, np.ndarray))
+                               else arg for arg in args)
+
+    @staticmethod
+    def _sizeOf(value):
+        if isinstance(value, tuple):
+            return sum(IndicatorCache._sizeOf(item) for item in value)
+        return int(getattr(value, "nbytes", 0)) + int(getattr(getattr(value, "index", None), "nbytes", 0))
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = self._sizeOf(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = value
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last = False)
+                self._bytes -= self._sizeOf(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes
+            }
+
+INDICATOR_CACHE = IndicatorCache()
+
+def cachedIndicator(func):
+    func_signature = signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # Panels of many tickers are computed once per scan, not worth the cache space
+        if any(isinstance(arg, np.ndarray) for arg in args):
+            return func(*args, **kwargs)
+        bound = func_signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = INDICATOR_CACHE.key(func.__name__, bound.arguments.values())
+        value = INDICATOR_CACHE.get(key)
+        if value is None:
+            value = func(*args, **kwargs)
+            INDICATOR_CACHE.put(key, value)
+        # Callers get their own copy so the cached series can never be modified in place
+        if value is None:
+            return None
+        if isinstance(value, tuple):
+            return tuple(item.copy() for item in value)
+        return value.copy()
+    return wrapper
+
+# Every helper returns float64 arrays aligned with its input (Indicators.py's NumPy kernels, pandas_ta's formulas).
+# They also take a (tickers x bars) NumPy panel instead of Series and then return NumPy panels
+
+@cachedIndicator
 def sma(close, length = 10):
-    return ta.sma(close = close, length = length)
+    if isinstance(close, np.ndarray):
+        return smaFamily(close, [length] * len(close))
+    return smaSeries(close, length)
 
+@cachedIndicator
 def rsi(close, length = 14):
-    return ta.rsi(close = close, length = length)
+    if isinstance(close, np.ndarray):
+        return rsiFamily(close, [length] * len(close))
+    return rsiSeries(close, length)
 
+@cachedIndicator
 def ema(close, length = 10):
-    return ta.ema(close, length = length)
+    if isinstance(close, np.ndarray):
+        return emaFamily(close, [length] * len(close))
+    return emaSeries(close, length)
 
+@cachedIndicator
 def atr(high, low, close, length = 14):
-    return ta.atr(high = high, low = low, close = close, length = length)
+    if isinstance(close, np.ndarray):
+        return atrFamily(high, low, close, [length] * len(close))
+    return atrSeries(high, low, close, length)
 
+@cachedIndicator
 def rh(high, window = 10):
-    return high.rolling(window = window).max()
+    if isinstance(high, np.ndarray):
+        return rollingMaxFamily(high, [window] * len(high))
+    return rollingMaxSeries(high, window)
 
+@cachedIndicator
 def rl(low, window = 10):
-    return low.rolling(window = window).min()
+    if isinstance(low, np.ndarray):
+        return rollingMinFamily(low, [window] * len(low))
+    return rollingMinSeries(low, window)
 
+@cachedIndicator
 def macd(close, fast = 12, slow = 26, signal = 9):
-    df = ta.macd(close = close, fast = fast, slow = slow, signal = signal)
-    macd_line = df.iloc[0:,0]
-    signal_line = df.iloc[0:,2]
-    return (macd_line, signal_line)
+    if isinstance(close, np.ndarray):
+        return macdPanel(close, fast, slow, signal)
+    return macdSeries(close, fast, slow, signal)
 
+@cachedIndicator
 def bbands(close, length = 5, std = 2):
-    df = ta.bbands(close = close, length = length, std = std)
-    lower_band = df.iloc[0:,0]
-    mid_band = df.iloc[0:,1]
-    upper_band = df.iloc[0:,2]
-    return (lower_band, mid_band, upper_band)
-
-def stoch(index, high, low, close, k = 14, d = 3):
-    df = ta.stoch(high = high, low = low, close = close, k = k, d = d)
-    df2 = pd.DataFrame(np.NaN, index = index[0:k-1] ,columns = df.columns)
-    df = pd.concat([df2, df])
-    k_line = df.iloc[:,0]
-    d_line = df.iloc[:,1]
-    return (k_line, d_line)
+    if isinstance(close, np.ndarray):
+        return bbandsPanel(close, length, std)
+    return bbandsSeries(close, length, std)
+
+@cachedIndicator
+def stoch(high, low, close, k = 14, d = 3):
+    if isinstance(close, np.ndarray):
+        return stochPanel(high, low, close, k, d)
+    return stochSeries(high, low, close, k, d)
+
+@cachedIndicator
+def obv(close, volume):
+    return obvSeries(close, volume)
+
+INDICATOR_FAMILIES = {
+    "sma": (smaFamily, ["Close"]),
+    "ema": (emaFamily, ["Close"]),
+    "rsi": (rsiFamily, ["Close"]),
+    "atr": (atrFamily, ["High", "Low", "Close"]),
+    "rh": (rollingMaxFamily, ["High"]),
+    "rl": (rollingMinFamily, ["Low"])
+}
+
+def warmIndicators(data, strategy, params = None):
+    # Computes every length a strategy's grid can ask for with one batched kernel per indicator and stores the rows
+    # in INDICATOR_CACHE under the helpers' own keys, so Strategy.init() and vectorSignals() just slice them out
+    params = params or {}
+    for name, param_names in getattr(strategy, "INDICATOR_LENGTHS", {}).items():
+        lengths = sorted({int(value) for param in param_names
+                          for value in [getattr(strategy, param), *params.get(param, [])]})
+        kernel, columns = INDICATOR_FAMILIES[name]
+        inputs = [data[column] for column in columns]
+        rows = kernel(*(series.to_numpy(dtype = float) for series in inputs), lengths)
+        for length, row in zip(lengths, rows):
+            INDICATOR_CACHE.put(INDICATOR_CACHE.key(name, [*inputs, length]), row.copy())
+
+def asArray(indicator):
+    return np.asarray(indicator, dtype = float)
+
+def previous(values):
+    # values[-2] of next(), aligned with the current bar (along the last axis, so panels shift per ticker)
+    shifted = np.empty_like(values)
+    shifted[..., 0] = np.nan
+    shifted[..., 1:] = values[..., :-1]
+    return shifted
 
 class SmaCross(Strategy):
     """
@@ -54,6 +236,7 @@ class SmaCross(Strategy):
     n2 = 20   # Slow SMA Length
     n3 = 14   # ATR Length
     n4 = 2    # Stop Loss Coefficient
+    INDICATOR_LENGTHS = {"sma": ["n1", "n2"], "atr": ["n3"]}
     
     def init(self):
         try:
@@ -74,6 +257,18 @@ class SmaCross(Strategy):
             self.position.close()
             self.sell(sl = stoploss)
 
+    @classmethod
+    def vectorSignals(cls, data, p):
+        close = asArray(data.Close)
+        fast_sma = asArray(sma(data.Close, p.n1))
+        slow_sma = asArray(sma(data.Close, p.n2))
+        atr_ = asArray(atr(data.High, data.Low, data.Close, p.n3))
+        cross_up = (previous(fast_sma) < previous(slow_sma)) & (fast_sma > slow_sma)
+        cross_down = (previous(fast_sma) > previous(slow_sma)) & (fast_sma < slow_sma)
+        actions = np.select([cross_up, cross_down], [Signals.CLOSE_BUY, Signals.CLOSE_SELL], Signals.NONE)
+        sl = np.where(cross_up, close - (p.n4 * atr_), close + (p.n4 * atr_))
+        return Signals([fast_sma, slow_sma, atr_], flat = actions, long = actions, short = actions, sl = sl)
+
 
 class RsiEmaCross(Strategy):
     """
@@ -89,6 +284,7 @@ class RsiEmaCross(Strategy):
     n3 = 14     # RSI Length
     n4 = 14     # ATR Length
     n5 = 2      # Stop Loss Coefficient
+    INDICATOR_LENGTHS = {"ema": ["n1", "n2"], "rsi": ["n3"], "atr": ["n4"]}
     
     def init(self):
         self.fast_ema = self.I(ema, self.data.Close.s, self.n1)
@@ -106,6 +302,21 @@ class RsiEmaCross(Strategy):
                self.position.is_long):
                  self.position.close()
 
+    @classmethod
+    def vectorSignals(cls, data, p):
+        close = asArray(data.Close)
+        fast_ema = asArray(ema(data.Close, p.n1))
+        slow_ema = asArray(ema(data.Close, p.n2))
+        rsi_ = asArray(rsi(data.Close, p.n3))
+        atr_ = asArray(atr(data.High, data.Low, data.Close, p.n4))
+        above = (close > slow_ema) & (close > fast_ema)
+        below = ~above & ((close < slow_ema) | (close < fast_ema))
+        entry = above & (previous(rsi_) < 70) & (rsi_ > 70)
+        return Signals([fast_ema, slow_ema, rsi_, atr_],
+                       flat = np.where(entry, Signals.BUY, Signals.NONE),
+                       long = np.where(below, Signals.CLOSE, Signals.NONE),
+                       sl = close - (p.n5 * atr_))
+
 
 class MACDEmaCrossover(Strategy):
     """
@@ -122,6 +333,7 @@ class MACDEmaCrossover(Strategy):
     n4 = 200   # Slow EMA Length
     n5 = 14    # ATR Length
     n6 = 2     # Stop Loss Coefficient
+    INDICATOR_LENGTHS = {"ema": ["n2"], "atr": ["n5"]}
     
     def init(self):
         self.macd_line, self.signal_line = self.I(macd, self.data.Close.s, self.n1, self.n2, self.n3)
@@ -140,6 +352,19 @@ class MACDEmaCrossover(Strategy):
             if (self.position.is_long):
                 self.position.close()
 
+    @classmethod
+    def vectorSignals(cls, data, p):
+        close = asArray(data.Close)
+        macd_line, signal_line = map(asArray, macd(data.Close, p.n1, p.n2, p.n3))
+        slow_ema = asArray(ema(data.Close, p.n2))
+        atr_ = asArray(atr(data.High, data.Low, data.Close, p.n5))
+        entry = (previous(macd_line) < previous(signal_line)) & (macd_line > signal_line) & (close > slow_ema)
+        exit_signal = ((previous(macd_line) > previous(signal_line)) & (macd_line < signal_line)) | (close < slow_ema)
+        return Signals([macd_line, signal_line, slow_ema, atr_],
+                       flat = np.where(entry, Signals.BUY, Signals.NONE),
+                       long = np.where(exit_signal, Signals.CLOSE, Signals.NONE),
+                       sl = close - (p.n5 * atr_))
+
 
 class BollingerBandBreakout(Strategy):
     """
@@ -167,6 +392,7 @@ class BollingerBandBreakout(Strategy):
     n7 = 30      # RSI Low Threshold
     n8 = 70      # RSI High Threshold
     n9 = 0.0015  # BBANDS Width Threshold
+    INDICATOR_LENGTHS = {"rsi": ["n3"], "atr": ["n4"]}
 
     def init(self):
         self.lower_band, self.mid_band, self.upper_band = self.I(bbands, self.data.Close.s, self.n1, self.n2)
@@ -192,6 +418,26 @@ class BollingerBandBreakout(Strategy):
                 takeprofit = self.data.Close[-1] - (self.n6 * self.atr[-1])
                 self.sell(sl = stoploss, tp = takeprofit)
 
+    @classmethod
+    def vectorSignals(cls, data, p):
+        close = asArray(data.Close)
+        high = asArray(data.High)
+        low = asArray(data.Low)
+        lower_band, mid_band, upper_band = map(asArray, bbands(data.Close, p.n1, p.n2))
+        band_width = (upper_band - lower_band)/mid_band
+        rsi_ = asArray(rsi(data.Close, p.n3))
+        atr_ = asArray(atr(data.High, data.Low, data.Close, p.n4))
+        go_long = ((previous(close) < previous(lower_band)) & (previous(rsi_) < p.n7) &
+                   (close > previous(high)) & (band_width > p.n9))
+        go_short = (~go_long & (previous(close) > previous(upper_band)) & (previous(rsi_) > p.n8) &
+                    (close < previous(low)) & (band_width > p.n9))
+        return Signals([lower_band, mid_band, upper_band, band_width, rsi_, atr_],
+                       flat = np.select([go_long, go_short], [Signals.BUY, Signals.SELL], Signals.NONE),
+                       long = np.where(go_short, Signals.CLOSE_SELL, Signals.NONE),
+                       short = np.where(go_long, Signals.CLOSE_BUY, Signals.NONE),
+                       sl = np.where(go_long, close - (p.n5 * atr_), close + (p.n5 * atr_)),
+                       tp = np.where(go_long, close + (p.n6 * atr_), close - (p.n6 * atr_)))
+
 
 class SMATrendFollowing(Strategy):
     """
@@ -202,6 +448,7 @@ class SMATrendFollowing(Strategy):
             then we close our positions
     """
     n1 = 50    # SMA Length
+    INDICATOR_LENGTHS = {"sma": ["n1"]}
 
     def init(self):
         self.sma = self.I(sma, self.data.Close.s, self.n1)
@@ -212,6 +459,14 @@ class SMATrendFollowing(Strategy):
         elif self.position and self.data.Close[-1] < self.sma[-1]:
             self.position.close()
 
+    @classmethod
+    def vectorSignals(cls, data, p):
+        close = asArray(data.Close)
+        sma_ = asArray(sma(data.Close, p.n1))
+        return Signals([sma_],
+                       flat = np.where(close > sma_, Signals.BUY, Signals.NONE),
+                       long = np.where(close < sma_, Signals.CLOSE, Signals.NONE))
+
 class StochasticCrossover(Strategy):
     """
         Stochastic Oscillator Strategy
@@ -228,10 +483,11 @@ class StochasticCrossover(Strategy):
     n4 = 2     # Stop Loss Coefficient
     n6 = 20    # Over Sold Threshold
     n7 = 80    # Over Bought Threshold
+    INDICATOR_LENGTHS = {"atr": ["n3"]}
 
     def init(self):
-        self.k_line, self.d_line = self.I(stoch, self.data.index, self.data.High.s, self.data.Low.s, 
-                                          self.data.Close.s, self.n1, self.n2)
+        self.k_line, self.d_line = self.I(stoch, self.data.High.s, self.data.Low.s, self.data.Close.s, self.n1,
+                                          self.n2)
         self.atr = self.I(atr, self.data.High.s, self.data.Low.s, self.data.Close.s, self.n3)
 
     def next(self):
@@ -243,6 +499,18 @@ class StochasticCrossover(Strategy):
             if self.d_line[-2] < self.k_line[-2] and self.d_line[-1] > self.k_line[-1] and self.k_line[-1] > self.n7:
                 self.position.close()
 
+    @classmethod
+    def vectorSignals(cls, data, p):
+        close = asArray(data.Close)
+        k_line, d_line = map(asArray, stoch(data.High, data.Low, data.Close, p.n1, p.n2))
+        atr_ = asArray(atr(data.High, data.Low, data.Close, p.n3))
+        entry = (previous(k_line) < previous(d_line)) & (k_line > d_line) & (k_line < p.n6)
+        exit_signal = (previous(d_line) < previous(k_line)) & (d_line > k_line) & (k_line > p.n7)
+        return Signals([k_line, d_line, atr_],
+                       flat = np.where(entry, Signals.BUY, Signals.NONE),
+                       long = np.where(exit_signal, Signals.CLOSE, Signals.NONE),
+                       sl = close - (p.n4 * atr_))
+
 STRATEGIES = {
     "SmaCross": SmaCross,
     "RsiEmaCross": RsiEmaCross,
@@ -311,28 +579,525 @@ STRATEGY_OPTIMIZATION = {
     }
 }
 
-def prepareData(results_best_returns, results_best_winrate):
+RESULT_FORMATS = ["json", "columnar"]
+EQUITY_POINTS = int(os.environ.get("BACKTEST_EQUITY_POINTS", 500))
+
+def tradeColumns(trades):
+    # The trade log as one typed array per column, times in epoch milliseconds
+    return {
+        "EntryPrice": FrameEncoder.columnValues(trades["EntryPrice"]),
+        "ExitPrice": FrameEncoder.columnValues(trades["ExitPrice"]),
+        "Profit&Loss": FrameEncoder.columnValues(trades["PnL"]),
+        "EntryTime": FrameEncoder.epochMillis(pd.DatetimeIndex(trades["EntryTime"])).tolist(),
+        "ExitTime": FrameEncoder.epochMillis(pd.DatetimeIndex(trades["ExitTime"])).tolist()
+    }
+
+def equityColumns(equity_curve, points):
+    # Equity curve reduced to at most `points` bars, keeping its shape and its highest and lowest values
+    index = FrameEncoder.epochMillis(equity_curve.index)
+    keep = lttbIndices(index, equity_curve["Equity"].to_numpy(dtype = float), points)
+    return {"index": index[keep].tolist(),
+            "columns": {"Equity": FrameEncoder.columnValues(equity_curve["Equity"].iloc[keep])}}
+
+def prepareResult(stats, format, points):
+    if format == "columnar":
+        result = {
+            "Win Rate %": finiteOrNone(stats["Win Rate [%]"]),
+            "Return %": finiteOrNone(stats["Return [%]"]),
+            "Trades": tradeColumns(stats['_trades'])
+        }
+        if points:
+            result["Equity"] = equityColumns(stats['_equity_curve'], points)
+        return result
+    return {
+        "Win Rate %": stats["Win Rate [%]"],
+        "Return %": stats["Return [%]"],
+        "Trades": {
+            "EntryPrice": stats['_trades']["EntryPrice"],
+            "ExitPrice": stats['_trades']["ExitPrice"],
+            "Profit&Loss": stats['_trades']["PnL"],
+            "EntryTime": stats['_trades']["EntryTime"],
+            "ExitTime": stats['_trades']["ExitTime"]
+        }
+    }
+
+def prepareData(results_best_returns, results_best_winrate, format = "json", points = EQUITY_POINTS):
     return ({
-        "results_best_returns" : {
-            "Win Rate %": results_best_returns["Win Rate [%]"],
-            "Return %": results_best_returns["Return [%]"],
-            "Trades": {
-                "EntryPrice": results_best_returns['_trades']["EntryPrice"],
-                "ExitPrice": results_best_returns['_trades']["ExitPrice"],
-                "Profit&Loss": results_best_returns['_trades']["PnL"],
-                "EntryTime": results_best_returns['_trades']["EntryTime"],
-                "ExitTime": results_best_returns['_trades']["ExitTime"]
-            }
-        },
-        "results_best_winrate" : {
-            "Win Rate %": results_best_winrate["Win Rate [%]"],
-            "Return %": results_best_winrate["Return [%]"],
-            "Trades": {
-                "EntryPrice": results_best_winrate['_trades']["EntryPrice"],
-                "ExitPrice": results_best_winrate['_trades']["ExitPrice"],
-                "Profit&Loss": results_best_winrate['_trades']["PnL"],
-                "EntryTime": results_best_winrate['_trades']["EntryTime"],
-                "ExitTime": results_best_winrate['_trades']["ExitTime"]
-            }
+        "results_best_returns" : prepareResult(results_best_returns, format, points),
+        "results_best_winrate" : prepareResult(results_best_winrate, format, points)
+    })
+
+ENGINES = {
+    "backtesting": (Backtest, "skopt"),
+    "vector": (VectorBacktest, "grid")
+}
+
+OPTIMIZATION_MODES = ["separate", "sweep", "halving"]
+
+def prepareParetoFront(records):
+    return [{
+        "Params": record["params"],
+        "Win Rate %": record["Win Rate [%]"],
+        "Return %": record["Return [%]"],
+        "Trades": record["# Trades"]
+    } for record in paretoFront(records)]
+
+class BacktestResultCache:
+    # Persistent optimization results per (ticker, interval, api, strategy, engine, mode, grid): the timestamps and row
+    # hashes of the bars they were computed on and the top parameter sets for each objective. When the bars it still
+    # shares with the new window are unchanged (the window may have slid forward, the last, still forming bar may have
+    # changed) just those candidates are re-scored instead of searching the grid again
+    CACHE_PATH = os.environ.get("BACKTEST_CACHE_PATH", "backtest_cache.sqlite")
+    TOP_K = int(os.environ.get("BACKTEST_CACHE_TOP_K", 10))
+    MAX_REFRESH = float(os.environ.get("BACKTEST_CACHE_MAX_REFRESH", 0.1))
+    OBJECTIVES = ['Equity Final [$]', 'Win Rate [%]']
+
+    def __init__(self, path = None):
+        self.path = path or self.CACHE_PATH
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            # Job workers are separate processes sharing the file, writers wait for each other's locks
+            self._conn = sqlite3.connect(self.path, timeout = 30, check_same_thread = False)
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS bar_results (
+                key TEXT PRIMARY KEY, searched_bars INTEGER, searched_until INTEGER, times BLOB, hashes BLOB,
+                rankings TEXT, extras TEXT, updated INTEGER)""")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def key(ticker, interval, api, s_name, engine, optimize, params):
+        grid = {name: repr(values) for name, values in params.items()}
+        payload = json.dumps([ticker, interval, api, s_name, engine, optimize, grid], sort_keys = True)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    @staticmethod
+    def barTimes(df):
+        return pd.DatetimeIndex(df.index).asi8
+
+    @staticmethod
+    def rowHashes(df):
+        # One hash per bar so a slid window can be compared with the cached one over the bars they share
+        return pd.util.hash_pandas_object(df[SharedFrame.COLUMNS], index = True).to_numpy()
+
+    def get(self, key):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT searched_bars, searched_until, times, hashes, rankings, extras FROM bar_results WHERE key = ?",
+                (key,)).fetchone()
+        if row is None:
+            return None
+        return {"searched_bars": row[0], "searched_until": row[1], "times": np.frombuffer(row[2], dtype = np.int64),
+                "hashes": np.frombuffer(row[3], dtype = np.uint64), "rankings": json.loads(row[4]),
+                "extras": json.loads(row[5])}
+
+    def put(self, key, df, searched_bars, searched_until, rankings, extras):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO bar_results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (key, searched_bars, int(searched_until), self.barTimes(df).tobytes(),
+                          self.rowHashes(df).tobytes(), json.dumps(rankings, default = finiteOrNone),
+                          json.dumps(extras, default = finiteOrNone), int(time.time())))
+            conn.commit()
+
+    def newBars(self, cached, df):
+        # Bars the full search has never seen, however often the candidates were re-scored since
+        return int(np.count_nonzero(self.barTimes(df) > cached["searched_until"]))
+
+    def status(self, cached, df):
+        if cached is None:
+            return "cold"
+        times, hashes = self.barTimes(df), self.rowHashes(df)
+        if np.array_equal(times, cached["times"]) and np.array_equal(hashes, cached["hashes"]):
+            return "hit"
+        # Locate the new window's first bar among the cached ones, older bars may have dropped off the front but
+        # the bars both windows share must line up one to one
+        start = np.searchsorted(cached["times"], times[0]) if len(times) else len(cached["times"])
+        shared = len(cached["times"]) - start
+        if shared < 2 or shared > len(times) or not np.array_equal(times[:shared], cached["times"][start:]):
+            return "cold"
+        # The last cached bar may still have been forming, everything before it has to be unchanged
+        if not np.array_equal(hashes[:shared - 1], cached["hashes"][start:-1]):
+            return "cold"
+        if self.newBars(cached, df) > cached["searched_bars"] * self.MAX_REFRESH:
+            return "cold"
+        return "partial"
+
+BACKTEST_RESULT_CACHE = BacktestResultCache()
+
+def optimizedParams(stats, names):
+    return {name: finiteOrNone(getattr(stats["_strategy"], name)) for name in names}
+
+def heatmapRanking(heatmap, best, k):
+    # The optimizer's winner first, then the next best combinations it tested
+    ranking = [best]
+    for index in heatmap.dropna().sort_values(ascending=False, kind="stable").index:
+        params = {name: finiteOrNone(value) for name, value in
+                  zip(heatmap.index.names, index if isinstance(index, tuple) else (index,))}
+        if len(ranking) >= k:
+            break
+        if params != best:
+            ranking.append(params)
+    return ranking
+
+def recordRanking(records, maximize, k):
+    return [record["params"] for record in topRecords(records, maximize, k)]
+
+def searchBacktest(bt, df, s_class, optimization_params, engine_class, method, optimize, k, max_evals = None,
+                   max_seconds = None):
+    # Full optimization, returns the stats of both winners, the response's extras and the candidates worth re-scoring
+    if optimize == "halving":
+        # The shortest slice still has to warm up the longest indicator twice over
+        longest = max(max(values) for values in optimization_params["params"].values())
+        halving = SuccessiveHalving(df, s_class, engine_class, cash=10000000, prepare=warmIndicators,
+                                    min_bars=max(SuccessiveHalving.MIN_BARS, 2 * int(longest)))
+        records = halving.run(
+            BacktestResultCache.OBJECTIVES,
+            **optimization_params["params"],
+            constraint=optimization_params.get("constraint", None),
+            max_evals=max_evals,
+            max_seconds=max_seconds)
+        if not records:
+            raise Exception(f"Every parameter combination failed for {s_class.__name__}")
+        rankings = {maximize: recordRanking(records, maximize, k) or [records[0]["params"]]
+                    for maximize in BacktestResultCache.OBJECTIVES}
+        winners = [bt.run(**bestRecord(records, maximize)["params"]) for maximize in BacktestResultCache.OBJECTIVES]
+        return winners, {"halving": halving.report}, rankings
+
+    if optimize == "sweep":
+        # One pass over the grid serves both objectives, only the two winners are re-run for their trade logs
+        records = ParameterSweep(df, s_class, engine_class, cash=10000000, prepare=warmIndicators).run(
+            **optimization_params["params"],
+            constraint=optimization_params.get("constraint", None))
+        if not records:
+            raise Exception(f"Every parameter combination failed for {s_class.__name__}")
+        rankings = {maximize: recordRanking(records, maximize, k) for maximize in BacktestResultCache.OBJECTIVES}
+        rankings["pareto"] = [record["params"] for record in paretoFront(records)]
+        winners = [bt.run(**bestRecord(records, maximize)["params"]) for maximize in BacktestResultCache.OBJECTIVES]
+        return winners, {"pareto_front": prepareParetoFront(records)}, rankings
+
+    winners, rankings = [], {}
+    for maximize in BacktestResultCache.OBJECTIVES:
+        stats, heatmap = bt.optimize(
+            **optimization_params["params"],
+            maximize=maximize,
+            constraint=optimization_params.get("constraint", None),
+            method=method,
+            return_heatmap=True)
+        winners.append(stats)
+        rankings[maximize] = heatmapRanking(heatmap, optimizedParams(stats, optimization_params["params"]), k)
+    return winners, {}, rankings
+
+def rescoreBacktest(bt, rankings, optimize, k):
+    # Re-runs only the cached candidates on the current bars and ranks them again
+    candidates = []
+    for ranking in rankings.values():
+        candidates += [params for params in ranking if params not in candidates]
+    records, _ = evaluateCombinations(bt, candidates)
+    if not records:
+        raise Exception("Every cached parameter combination failed on the new bars")
+    rescored = {maximize: recordRanking(records, maximize, k) or [records[0]["params"]]
+                for maximize in BacktestResultCache.OBJECTIVES}
+    extras = {}
+    if optimize == "sweep":
+        pareto = paretoFront(records)
+        rescored["pareto"] = [record["params"] for record in pareto]
+        extras["pareto_front"] = prepareParetoFront(records)
+    winners = [bt.run(**rescored[maximize][0]) for maximize in BacktestResultCache.OBJECTIVES]
+    return winners, extras, rescored, len(candidates)
+
+def runBacktest(ticker, interval, api, s_name, engine = "backtesting", optimize = "separate", use_cache = True,
+                format = "json", points = EQUITY_POINTS, max_evals = None, max_seconds = None):
+    if (s_name not in STRATEGIES) or (s_name not in STRATEGY_OPTIMIZATION):
+        raise Exception(f"Strategy not found: {s_name}")
+    if engine not in ENGINES:
+        raise Exception(f"Unsupported Engine\n Following are the Engines: {', '.join(ENGINES)}")
+    if optimize not in OPTIMIZATION_MODES:
+        raise Exception(f"Unsupported Optimization Mode\n Following are the Modes: {', '.join(OPTIMIZATION_MODES)}")
+    if format not in RESULT_FORMATS:
+        raise Exception(f"Unsupported Result Format\n Following are the Formats: {', '.join(RESULT_FORMATS)}")
+    s_class = STRATEGIES[s_name]
+    optimization_params = STRATEGY_OPTIMIZATION[s_name]
+    engine_class, method = ENGINES[engine]
+    scraper = StockScraper(ticker=ticker, interval=interval, api=api)
+    df = scraper.getFrame()
+    df = df.rename_axis('Date')
+    df.dropna(inplace=True)
+    bt = engine_class(df, s_class, cash=10000000)
+    warmIndicators(df, s_class, optimization_params["params"])
+
+    cache, k = BACKTEST_RESULT_CACHE, BACKTEST_RESULT_CACHE.TOP_K
+    # A halving search is only as good as its budget, a larger one must not be answered from a smaller one's results
+    mode = [optimize, max_evals, max_seconds] if optimize == "halving" else optimize
+    key = cache.key(ticker, interval, api, s_name, engine, mode, optimization_params["params"])
+    cached = cache.get(key) if use_cache else None
+    status = cache.status(cached, df)
+    rescored = 0
+    if status == "hit":
+        # Same bars as last time, only the two winners are re-run for their trade logs
+        winners = [bt.run(**cached["rankings"][maximize][0]) for maximize in cache.OBJECTIVES]
+        extras = cached["extras"]
+    elif status == "partial":
+        winners, extras, rankings, rescored = rescoreBacktest(bt, cached["rankings"], optimize, k)
+        # Rescoring keeps the search that produced the candidates (e.g. its halving report), only its own extras
+        # replace the cached ones
+        extras = {**cached["extras"], **extras}
+        cache.put(key, df, cached["searched_bars"], cached["searched_until"], rankings, extras)
+    else:
+        winners, extras, rankings = searchBacktest(bt, df, s_class, optimization_params, engine_class, method,
+                                                   optimize, k, max_evals, max_seconds)
+        cache.put(key, df, len(df), cache.barTimes(df)[-1], rankings, extras)
+
+    results = prepareData(*winners, format = format, points = points)
+    results.update(extras)
+    results["cache"] = {
+        "status": status,
+        "bars": len(df),
+        "new_bars": cache.newBars(cached, df) if status == "partial" else 0,
+        "rescored": rescored
+    }
+    return results
+
+
+########  Walk Forward  ########
+
+def finiteOrNone(value):
+    value = value.item() if isinstance(value, np.generic) else value
+    return None if isinstance(value, float) and np.isnan(value) else value
+
+def outOfSampleStats(stats, test_start):
+    # Scores only the bars from test_start on, of a run that started earlier so its indicators are already warm
+    equity = stats["_equity_curve"]["Equity"].to_numpy(dtype = float)[test_start - 1:]
+    trades = stats["_trades"]
+    pnl = trades["PnL"].to_numpy(dtype = float)[trades["EntryBar"].to_numpy() >= test_start]
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        drawdown = 1 - equity / np.maximum.accumulate(equity)
+    return {
+        "Return %": (equity[-1] / equity[0] - 1) * 100 if equity[0] > 0 else np.nan,
+        "Max. Drawdown %": -np.nan_to_num(np.nanmax(drawdown, initial = 0)) * 100,
+        "Win Rate %": (pnl > 0).mean() * 100 if len(pnl) else np.nan,
+        "Trades": len(pnl),
+        "Wins": int((pnl > 0).sum())
+    }
+
+def walkForwardFold(data, s_name, engine, bounds):
+    # Optimizes on the training bars, then runs the winner from the start of training to the end of the test window
+    train_start, test_start, test_end = bounds
+    s_class = STRATEGIES[s_name]
+    optimization_params = STRATEGY_OPTIMIZATION[s_name]
+    engine_class, method = ENGINES[engine]
+    train = data.iloc[train_start:test_start]
+    warmIndicators(train, s_class, optimization_params["params"])
+    best = engine_class(train, s_class, cash=10000000).optimize(
+        **optimization_params["params"],
+        maximize='Equity Final [$]',
+        constraint=optimization_params.get("constraint", None),
+        method=method,
+        random_state=0)
+    params = optimizedParams(best, optimization_params["params"])
+    stats = engine_class(data.iloc[train_start:test_end], s_class, cash=10000000).run(**params)
+    return {
+        "Train": [data.index[train_start].isoformat(), data.index[test_start - 1].isoformat()],
+        "Test": [data.index[test_start].isoformat(), data.index[test_end - 1].isoformat()],
+        "Params": params,
+        **outOfSampleStats(stats, test_start - train_start)
+    }
+
+def aggregateFolds(records):
+    returns = np.array([record["Return %"] for record in records], dtype = float) / 100
+    trades = sum(record["Trades"] for record in records)
+    wins = sum(record["Wins"] for record in records)
+    return {
+        "Folds": len(records),
+        "Return %": (np.prod(1 + returns[~np.isnan(returns)]) - 1) * 100,
+        "Mean Fold Return %": np.nanmean(returns) * 100 if (~np.isnan(returns)).any() else np.nan,
+        "Profitable Folds %": (returns > 0).mean() * 100,
+        "Win Rate %": wins / trades * 100 if trades else np.nan,
+        "Trades": trades,
+        "Max. Drawdown %": min(record["Max. Drawdown %"] for record in records)
+    }
+
+def walkForwardTask(data, task):
+    ticker, s_name, fold, bounds, engine = task
+    try:
+        record = walkForwardFold(data, s_name, engine, bounds)
+    except Exception as e:
+        return None, f"{ticker} {s_name} fold {fold}: {e}"
+    return {"Ticker": ticker, "Strategy": s_name, "Fold": fold, **record}, None
+
+_walk_forward_frames = {}
+_walk_forward_data = {}
+
+def _initWalkForwardWorker(frames):
+    global _walk_forward_frames
+    _walk_forward_frames = frames
+
+def _walkForwardWorkerTask(task):
+    ticker = task[0]
+    if ticker not in _walk_forward_data:
+        _walk_forward_data[ticker] = _walk_forward_frames[ticker].toFrame()
+    return walkForwardTask(_walk_forward_data[ticker], task)
+
+
+class WalkForward:
+    """
+        Rolling walk forward optimization of several strategies on several tickers. Every (ticker, strategy, fold)
+        is optimized on its training window and scored on the test window after it, the tasks are spread over a
+        spawn process pool whose workers read each ticker's OHLCV bars from shared memory.
+    """
+    MAX_WORKERS = int(os.environ.get("WALK_FORWARD_WORKERS", os.cpu_count() or 1))
+
+    def __init__(self, frames, s_names, engine = "backtesting", folds = 4, train_fraction = 0.7, max_workers = None):
+        self.frames = frames
+        self.s_names = s_names
+        self.engine = engine
+        self.folds = folds
+        self.train_fraction = train_fraction
+        self.max_workers = max_workers or self.MAX_WORKERS
+        self.errors = []
+
+    def tasks(self):
+        tasks = []
+        for ticker, data in self.frames.items():
+            try:
+                bounds = walkForwardFolds(len(data), self.folds, self.train_fraction)
+            except ValueError as e:
+                self.errors.append(f"{ticker}: {e}")
+                continue
+            tasks += [(ticker, s_name, fold, fold_bounds, self.engine)
+                      for s_name in self.s_names for fold, fold_bounds in enumerate(bounds)]
+        return tasks
+
+    def run(self):
+        tasks = self.tasks()
+        if self.max_workers <= 1 or len(tasks) <= 1:
+            results = [walkForwardTask(self.frames[task[0]], task) for task in tasks]
+        else:
+            frames = {ticker: SharedFrame.create(data) for ticker, data in self.frames.items()}
+            try:
+                with ProcessPoolExecutor(max_workers = min(self.max_workers, len(tasks)),
+                                         mp_context = multiprocessing.get_context("spawn"),
+                                         initializer = _initWalkForwardWorker,
+                                         initargs = (frames,)) as executor:
+                    results = list(executor.map(_walkForwardWorkerTask, tasks))
+            except Exception as e:
+                raise Exception(f"Error running walk forward\n {e}")
+            finally:
+                for frame in frames.values():
+                    frame.close(unlink = True)
+        self.errors += [error for _, error in results if error is not None]
+        return [record for record, _ in results if record is not None]
+
+    def summary(self, records):
+        by_ticker = {}
+        for record in records:
+            by_ticker.setdefault(record["Ticker"], {}).setdefault(record["Strategy"], []).append(record)
+        by_ticker = {ticker: {s_name: aggregateFolds(folds) for s_name, folds in strategies.items()}
+                     for ticker, strategies in by_ticker.items()}
+        by_strategy = {}
+        for s_name in self.s_names:
+            folds = [record for record in records if record["Strategy"] == s_name]
+            if not folds:
+                continue
+            # Folds are compounded per ticker, the strategy's return is the mean over its tickers
+            ticker_returns = [strategies[s_name]["Return %"] for strategies in by_ticker.values() if s_name in strategies]
+            by_strategy[s_name] = {**aggregateFolds(folds), "Return %": np.mean(ticker_returns),
+                                   "Tickers": len(ticker_returns)}
+        clean = lambda stats: {key: finiteOrNone(value) for key, value in stats.items()}
+        return {
+            "by_strategy": {s_name: clean(stats) for s_name, stats in by_strategy.items()},
+            "by_ticker": {ticker: {s_name: clean(stats) for s_name, stats in strategies.items()}
+                          for ticker, strategies in by_ticker.items()},
+            "folds": [clean(record) for record in records],
+            "errors": self.errors
+        }
+
+def runWalkForward(tickers, interval, api, s_names, engine = "backtesting", folds = 4, train_fraction = 0.7):
+    missing = [s_name for s_name in s_names if s_name not in STRATEGIES or s_name not in STRATEGY_OPTIMIZATION]
+    if missing:
+        raise Exception(f"Strategy not found: {', '.join(missing)}")
+    if engine not in ENGINES:
+        raise Exception(f"Unsupported Engine\n Following are the Engines: {', '.join(ENGINES)}")
+    frames, errors = {}, []
+    for ticker, df, error in BatchStockScraper(tickers=tickers, interval=interval, api=api).iterFrames():
+        if error is not None:
+            errors.append(f"{ticker}: {error}")
+            continue
+        frames[ticker] = df.rename_axis('Date').dropna()
+    walk_forward = WalkForward(frames, s_names, engine=engine, folds=folds, train_fraction=train_fraction)
+    walk_forward.errors = errors
+    return walk_forward.summary(walk_forward.run())
+
+
+########  Scanner  ########
+
+SCAN_BARS = int(os.environ.get("SCAN_BARS", 300))
+
+SIGNAL_NAMES = {
+    Signals.BUY: "buy",
+    Signals.SELL: "sell",
+    Signals.CLOSE: "close",
+    Signals.CLOSE_BUY: "close_and_buy",
+    Signals.CLOSE_SELL: "close_and_sell"
+}
+
+def scanPanel(frames, s_name, params):
+    # Evaluates a strategy's next() conditions for every ticker at once: the frames (all of the same length) are
+    # stacked into (tickers x bars) panels that vectorSignals() computes its indicators and rules on
+    tickers = list(frames)
+    panel = SimpleNamespace(**{column: np.stack([frames[ticker][column].to_numpy(dtype = float) for ticker in tickers])
+                               for column in SharedFrame.COLUMNS})
+    s_class = STRATEGIES[s_name]
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        signals = s_class.vectorSignals(panel, strategyParams(s_class, params))
+    states = {"flat": signals.flat[:, -1], "long": signals.long[:, -1], "short": signals.short[:, -1]}
+    # Like backtesting.py, next() only runs once every indicator was already valid on the bar before
+    ready = (len(frames[tickers[0]]) > 1 and
+             np.all([~np.isnan(np.asarray(indicator, dtype = float)[:, -2]) for indicator in signals.indicators], axis = 0))
+    active = np.any([actions != Signals.NONE for actions in states.values()], axis = 0) & ready
+    records = []
+    for row in np.flatnonzero(active):
+        actions = {state: SIGNAL_NAMES[int(values[row])] for state, values in states.items() if values[row]}
+        record = {
+            "Ticker": tickers[row],
+            "Time": frames[tickers[row]].index[-1].isoformat(),
+            "Close": panel.Close[row, -1],
+            "Signals": actions
         }
-    })
\ No newline at end of file
+        if any(Signals.entryOf(values[row]) for values in states.values()):
+            record["SL"] = signals.sl[row, -1]
+            record["TP"] = signals.tp[row, -1]
+        records.append({key: finiteOrNone(value) for key, value in record.items()})
+    return records
+
+def runScanner(tickers, interval, api, s_names, params = None, bars = SCAN_BARS):
+    # Signals each strategy would act on at the latest bar, keyed by the position state they apply to
+    params = params or {}
+    missing = [s_name for s_name in [*s_names, *params] if s_name not in STRATEGIES]
+    if missing:
+        raise Exception(f"Strategy not found: {', '.join(missing)}")
+    groups, errors = {}, {}
+    for ticker, df, error in BatchStockScraper(tickers=tickers, interval=interval, api=api).iterFrames():
+        if error is not None:
+            errors[ticker] = error
+            continue
+        df = df.dropna().tail(bars)
+        if df.empty:
+            errors[ticker] = f"No data returned for {ticker}"
+            continue
+        # Tickers with a shorter history form their own panel
+        groups.setdefault(len(df), {})[ticker] = df
+    signals = {}
+    for s_name in s_names:
+        records = []
+        for frames in groups.values():
+            records += scanPanel(frames, s_name, params.get(s_name, {}))
+        signals[s_name] = sorted(records, key=lambda record: record["Ticker"])
+    return {
+        "signals": signals,
+        "scanned": sum(len(frames) for frames in groups.values()),
+        "bars": bars,
+        "errors": errors
+    }
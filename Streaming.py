@@ -0,0 +1,288 @@
+import json
+import time
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+from binance import ThreadedWebsocketManager
+
+
+class BarRingBuffer:
+    # Fixed-size buffer of the last `capacity` bars as rows of (open time ms, open, high, low, close, volume)
+
+    def __init__(self, capacity, interval_ms = None):
+        self.capacity = capacity
+        self.interval_ms = interval_ms
+        self._bars = np.full((capacity, 6), np.nan)
+        self._head = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def _last(self):
+        return (self._head - 1) % self.capacity
+
+    def _first(self):
+        return (self._head - self._count) % self.capacity
+
+    def update(self, open_time, open, high, low, close, volume):
+        with self._lock:
+            if self._count:
+                last_time = self._bars[self._last(), 0]
+                if open_time == last_time:
+                    # The bar is still forming, overwrite it in place
+                    self._bars[self._last()] = (open_time, open, high, low, close, volume)
+                    return
+                if open_time < last_time:
+                    return
+                if self.interval_ms and open_time - last_time > self.interval_ms:
+                    # Missed bars would leave a hole in the series, start over from this bar
+                    self._count = 0
+            self._bars[self._head] = (open_time, open, high, low, close, volume)
+            self._head = (self._head + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def seed(self, rows):
+        for row in rows:
+            self.update(*row)
+
+    def firstTime(self):
+        with self._lock:
+            return self._bars[self._first(), 0] if self._count else None
+
+    def covers(self, start_ms):
+        first_time = self.firstTime()
+        return first_time is not None and first_time <= start_ms
+
+    def toFrame(self):
+        with self._lock:
+            # The oldest bar is not at row 0 once the buffer wrapped around or a gap started it over mid-array
+            rows = np.take(self._bars, (self._first() + np.arange(self._count)) % self.capacity, axis = 0)
+        data = pd.DataFrame(rows[:, 1:], columns = ['Open', 'High', 'Low', 'Close', 'Volume'],
+                            index = pd.to_datetime(rows[:, 0].astype(np.int64), unit = 'ms'))
+        return data.rename_axis('Date')
+
+
+class BinanceKlineSource:
+
+    def __init__(self, pairs):
+        self.pairs = pairs
+        self.manager = None
+
+    def start(self, callback):
+        try:
+            self.manager = ThreadedWebsocketManager()
+            self.manager.start()
+            for symbol, interval in self.pairs:
+                self.manager.start_kline_socket(callback = callback, symbol = symbol, interval = interval)
+        except Exception as e:
+            raise Exception(f"Error starting Binance kline streams\n {e}")
+
+    def stop(self):
+        if self.manager is not None:
+            self.manager.stop()
+            self.manager = None
+
+
+class ReplayKlineSource:
+    # Offline stand-in for BinanceKlineSource, feeds recorded kline messages to the stream
+
+    def __init__(self, messages = None, path = None, speed = 0):
+        if messages is None and path is None:
+            raise Exception("ReplayKlineSource needs messages or a recording path")
+        self.messages = messages if messages is not None else self.load(path)
+        self.speed = speed
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def load(path):
+        with open(path) as file:
+            return [json.loads(line) for line in file if line.strip()]
+
+    def _run(self, callback):
+        last_event_time = None
+        for message in self.messages:
+            if self._stop.is_set():
+                break
+            event_time = message.get("E")
+            if self.speed and last_event_time is not None and event_time is not None:
+                time.sleep(max(event_time - last_event_time, 0) / 1000 / self.speed)
+            last_event_time = event_time
+            callback(message)
+
+    def start(self, callback):
+        self._stop.clear()
+        if not self.speed:
+            self._run(callback)
+            return
+        self._thread = threading.Thread(target = self._run, args = (callback,), daemon = True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class KlineStream:
+    INTERVAL_MAP = {
+        "1min": "1m", "5min": "5m", "1hr": "1h", "1day": "1d", "1week": "1w", "1mon": "1M"
+    }
+    INTERVAL_MS = {
+        "1min": 60_000, "5min": 300_000, "1hr": 3_600_000, "1day": 86_400_000, "1week": 604_800_000, "1mon": None
+    }
+
+    def __init__(self, symbols, intervals, capacity = 4000, source = None, record_path = None):
+        # capacity is the number of bars kept per buffer, or a {interval: bars} dict sizing each interval on its own
+        for interval in intervals:
+            if interval not in self.INTERVAL_MAP:
+                raise Exception(f"Unsupported Interval\n Following are the Intervals: {', '.join(self.INTERVAL_MAP)}")
+        self.capacities = {interval: capacity[interval] if isinstance(capacity, dict) else capacity
+                           for interval in intervals}
+        self.buffers = {(symbol, interval): BarRingBuffer(self.capacities[interval], self.INTERVAL_MS[interval])
+                        for symbol in symbols for interval in intervals}
+        self._intervals = {code: interval for interval, code in self.INTERVAL_MAP.items()}
+        self.source = source or BinanceKlineSource(
+            [(symbol, self.INTERVAL_MAP[interval]) for symbol in symbols for interval in intervals])
+        self.record_path = record_path
+        self._record_lock = threading.Lock()
+
+    def handleMessage(self, message):
+        # Combined streams wrap the payload as {"stream": ..., "data": ...}
+        message = message.get("data", message)
+        if message.get("e") != "kline":
+            return
+        if self.record_path:
+            with self._record_lock, open(self.record_path, "a") as file:
+                file.write(json.dumps(message) + "\n")
+        kline = message["k"]
+        buffer = self.buffers.get((kline["s"], self._intervals.get(kline["i"])))
+        if buffer is None:
+            return
+        buffer.update(kline["t"], float(kline["o"]), float(kline["h"]), float(kline["l"]),
+                      float(kline["c"]), float(kline["v"]))
+
+    def seed(self, symbol, interval, rows):
+        self.buffers[(symbol, interval)].seed(rows)
+
+    def start(self):
+        self.source.start(self.handleMessage)
+
+    def stop(self):
+        self.source.stop()
+
+    def getFrame(self, symbol, interval, start_ms):
+        buffer = self.buffers.get((symbol, interval))
+        if buffer is None or not buffer.covers(start_ms):
+            return None
+        return buffer.toFrame()
+
+
+class ReplayKlineServer:
+    # Offline stand-in for Binance's REST kline endpoint: serves /api/v3/klines from recorded rows, paged by
+    # startTime/endTime/limit like Binance. Point BINANCE_API_URL (or BinanceKlineFetcher's base_url) at `url`
+    MAX_LIMIT = 1000
+
+    def __init__(self, klines, host = "127.0.0.1", port = 0, latency = 0):
+        # klines maps (symbol, binance interval code) to kline rows [open time ms, open, high, low, close, volume, ...]
+        self.klines = {key: sorted(rows, key = lambda row: row[0]) for key, rows in klines.items()}
+        self._open_times = {key: np.array([row[0] for row in rows], dtype = np.int64)
+                            for key, rows in self.klines.items()}
+        self.latency = latency
+        self.requests = []
+        self.max_concurrent = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @staticmethod
+    def klineRows(data, interval_ms):
+        # OHLCV frame to Binance's kline rows, prices and volume as strings the way the API sends them
+        open_times = pd.DatetimeIndex(data.index).asi8 // 1_000_000
+        return [[int(open_time), str(row[0]), str(row[1]), str(row[2]), str(row[3]), str(row[4]),
+                 int(open_time) + interval_ms - 1]
+                for open_time, row in zip(open_times, data[['Open', 'High', 'Low', 'Close', 'Volume']].to_numpy())]
+
+    @staticmethod
+    def fromMessages(messages):
+        # Closed klines of a KlineStream recording (record_path), keyed like the REST endpoint
+        klines = {}
+        for message in messages:
+            kline = message.get("data", message).get("k")
+            if kline is None or not kline.get("x"):
+                continue
+            klines.setdefault((kline["s"], kline["i"]), {})[kline["t"]] = [
+                kline["t"], kline["o"], kline["h"], kline["l"], kline["c"], kline["v"], kline["T"]]
+        return {key: list(rows.values()) for key, rows in klines.items()}
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def query(self, symbol, interval, start_ms = None, end_ms = None, limit = 500):
+        key = (symbol, interval)
+        if key not in self.klines:
+            return None
+        open_times = self._open_times[key]
+        first = 0 if start_ms is None else int(np.searchsorted(open_times, start_ms, side = "left"))
+        last = len(open_times) if end_ms is None else int(np.searchsorted(open_times, end_ms, side = "right"))
+        return self.klines[key][first:min(last, first + min(limit, self.MAX_LIMIT))]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {name: values[0] for name, values in parse_qs(url.query).items()}
+                with server._lock:
+                    server._active += 1
+                    server.max_concurrent = max(server.max_concurrent, server._active)
+                    server.requests.append(params)
+                try:
+                    if server.latency:
+                        time.sleep(server.latency)
+                    if url.path != "/api/v3/klines":
+                        return self._send(404, {"code": -1, "msg": "Not found"})
+                    try:
+                        rows = server.query(params["symbol"], params["interval"],
+                                            int(params["startTime"]) if "startTime" in params else None,
+                                            int(params["endTime"]) if "endTime" in params else None,
+                                            int(params.get("limit", 500)))
+                    except (KeyError, ValueError):
+                        return self._send(400, {"code": -1102, "msg": "Mandatory parameter was not sent or malformed"})
+                    if rows is None:
+                        return self._send(400, {"code": -1121, "msg": "Invalid symbol."})
+                    self._send(200, rows)
+                finally:
+                    with server._lock:
+                        server._active -= 1
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target = self._server.serve_forever, daemon = True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,275 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+from types import SimpleNamespace
+
+from Optimization import parameterGrid
+
+
+class Signals:
+    # Orders a strategy's next() would place at every bar, once for each position state it can be in at that bar:
+    # flat, long or short. sl/tp hold the stop loss / take profit prices of the entries placed at that bar.
+    NONE = 0
+    BUY = 1
+    SELL = -1
+    CLOSE = 2
+    CLOSE_BUY = 3
+    CLOSE_SELL = -3
+
+    def __init__(self, indicators, flat, long = None, short = None, sl = None, tp = None):
+        shape = np.shape(flat)
+        self.indicators = indicators
+        self.flat = np.asarray(flat, dtype = np.int8)
+        self.long = np.zeros(shape, dtype = np.int8) if long is None else np.asarray(long, dtype = np.int8)
+        self.short = np.zeros(shape, dtype = np.int8) if short is None else np.asarray(short, dtype = np.int8)
+        self.sl = np.full(shape, np.nan) if sl is None else np.asarray(sl, dtype = float)
+        self.tp = np.full(shape, np.nan) if tp is None else np.asarray(tp, dtype = float)
+
+    @staticmethod
+    def entryOf(action):
+        return 1 if action in (Signals.BUY, Signals.CLOSE_BUY) else -1 if action in (Signals.SELL, Signals.CLOSE_SELL) else 0
+
+    @staticmethod
+    def closes(actions):
+        return np.isin(actions, (Signals.CLOSE, Signals.CLOSE_BUY, Signals.CLOSE_SELL))
+
+    def warmup(self):
+        # Same rule as backtesting.py: next() starts one bar after the indicator that becomes valid last
+        return max((int(np.isnan(np.asarray(indicator, dtype = float)).argmin()) for indicator in self.indicators),
+                   default = 0)
+
+
+def strategyDefaults(strategy):
+    return {name: value for klass in reversed(strategy.__mro__) for name, value in vars(klass).items()
+            if not name.startswith("_") and isinstance(value, (int, float)) and not isinstance(value, bool)}
+
+def strategyParams(strategy, params):
+    # The strategy's parameters as vectorSignals() reads them, defaults overridden by params
+    defaults = strategyDefaults(strategy)
+    for name in params:
+        if name not in defaults:
+            raise AttributeError(f"Strategy '{strategy.__name__}' is missing parameter '{name}'")
+    return SimpleNamespace(**{**defaults, **params})
+
+
+class StrategyParams(SimpleNamespace):
+    # Stands in for the Strategy instance backtesting.py puts in its stats: every parameter of the run is an attribute
+    def __init__(self, name, params, defaults):
+        super().__init__(**{**defaults, **params})
+        self._label = f"{name}({','.join(f'{key}={value}' for key, value in params.items())})"
+
+    def __repr__(self):
+        return self._label
+
+
+class VectorBacktest:
+    """
+        Array based alternative to backtesting.Backtest for strategies that implement vectorSignals()
+        Fills follow backtesting.py's broker with its default settings (no commission, spread or margin, no
+        hedging, orders fill on the next open, trades left open at the end are not closed): SL/TP are checked
+        from the entry bar onwards with the stop loss first, and a close placed by next() fills before them.
+    """
+    MAX_TRIES = int(os.environ.get("VECTOR_MAX_TRIES", 2000))
+    FULL_EQUITY = 1 - sys.float_info.epsilon
+
+    def __init__(self, data, strategy, cash = 10_000):
+        if not hasattr(strategy, "vectorSignals"):
+            raise Exception(f"Strategy {strategy.__name__} has no vectorized signals")
+        self.data = data
+        self.strategy = strategy
+        self.cash = float(cash)
+        self.open = data.Open.to_numpy(dtype = float)
+        self.high = data.High.to_numpy(dtype = float)
+        self.low = data.Low.to_numpy(dtype = float)
+        self.close = data.Close.to_numpy(dtype = float)
+
+    def defaults(self):
+        return strategyDefaults(self.strategy)
+
+    def params(self, params):
+        return strategyParams(self.strategy, params)
+
+    @staticmethod
+    def nextEvent(events, bar):
+        position = np.searchsorted(events, bar)
+        return int(events[position]) if position < len(events) else None
+
+    def _stop(self, direction, sl, tp, entry_bar, last_bar):
+        # First bar in [entry_bar, last_bar] where the SL or TP order fills, and its fill price
+        low = self.low[entry_bar:last_bar + 1]
+        high = self.high[entry_bar:last_bar + 1]
+        hits = []
+        if not np.isnan(sl):
+            hit = (low <= sl) if direction > 0 else (high >= sl)
+            if hit.any():
+                hits.append((int(hit.argmax()), 0, sl))
+        if not np.isnan(tp):
+            hit = (high >= tp) if direction > 0 else (low <= tp)
+            if hit.any():
+                hits.append((int(hit.argmax()), 1, tp))
+        if not hits:
+            return None, None
+        offset, kind, price = min(hits)
+        bar = entry_bar + offset
+        open_price = self.open[bar]
+        if (kind == 0) == (direction > 0):
+            return bar, min(open_price, price)
+        return bar, max(open_price, price)
+
+    def _checkOrder(self, direction, sl, tp, price):
+        sl = None if np.isnan(sl) else sl
+        tp = None if np.isnan(tp) else tp
+        if direction > 0 and not (sl or -np.inf) < price < (tp or np.inf):
+            raise ValueError(f"Long orders require: SL ({sl}) < LIMIT ({price}) < TP ({tp})")
+        if direction < 0 and not (tp or -np.inf) < price < (sl or np.inf):
+            raise ValueError(f"Short orders require: TP ({tp}) < LIMIT ({price}) < SL ({sl})")
+
+    def simulate(self, signals, start):
+        length = len(self.close)
+        actions = {1: signals.long, -1: signals.short}
+        flat_events = np.flatnonzero(signals.flat != Signals.NONE)
+        flat_events = flat_events[flat_events >= start]
+        close_events = {direction: np.flatnonzero(Signals.closes(actions[direction]))
+                        for direction in actions}
+        cash = self.cash
+        equity = np.full(length, cash)
+        trades = []
+        bar, direction, signal_bar = start, 0, None
+
+        while True:
+            if not direction:
+                signal_bar = self.nextEvent(flat_events, bar)
+                if signal_bar is None:
+                    break
+                direction = Signals.entryOf(signals.flat[signal_bar])
+                if not direction:
+                    bar = signal_bar + 1
+                    continue
+            sl, tp = signals.sl[signal_bar], signals.tp[signal_bar]
+            self._checkOrder(direction, sl, tp, self.close[signal_bar])
+            # An entry placed by next() at signal_bar fills on the open of the following bar
+            entry_bar = signal_bar + 1
+            if entry_bar >= length:
+                break
+            entry_price = self.open[entry_bar]
+            size = direction * int((cash * 1.0 * self.FULL_EQUITY) // entry_price)
+            if not size:
+                bar, direction = entry_bar, 0
+                continue
+            if sl <= 0 or tp <= 0:
+                raise ValueError(f"Make sure 0 < price < inf! price: {sl if sl <= 0 else tp}")
+
+            exit_signal = self.nextEvent(close_events[direction], entry_bar)
+            if exit_signal is not None and exit_signal + 1 >= length:
+                exit_signal = None
+            last_bar = length - 1 if exit_signal is None else exit_signal
+            stop_bar, stop_price = self._stop(direction, sl, tp, entry_bar, last_bar)
+            if stop_bar is not None:
+                exit_bar, exit_price = stop_bar, stop_price
+            elif exit_signal is not None:
+                exit_bar = exit_signal + 1
+                exit_price = self.open[exit_bar]
+            else:
+                exit_bar, exit_price = length, None
+
+            held = slice(entry_bar, exit_bar)
+            equity[held] = cash + (self.close[held] * size - size * entry_price)
+            broke = np.flatnonzero(equity[held] <= 0)
+            if len(broke):
+                # Out of money: backtesting.py closes everything at that bar's close and stops
+                exit_bar = entry_bar + int(broke[0])
+                exit_price = self.close[exit_bar]
+                trades.append((size, entry_bar, exit_bar, entry_price, exit_price, sl, tp,
+                               size * (exit_price - entry_price)))
+                equity[exit_bar:] = 0
+                break
+            if exit_price is None:
+                break
+            pnl = size * (exit_price - entry_price)
+            trades.append((size, entry_bar, exit_bar, entry_price, exit_price, sl, tp, pnl))
+            cash += pnl
+            equity[exit_bar:] = cash
+            if cash <= 0:
+                equity[exit_bar:] = 0
+                break
+
+            if stop_bar is not None:
+                bar, direction = stop_bar, 0
+                continue
+            action = actions[direction][exit_signal]
+            bar, direction = exit_bar, Signals.entryOf(action)
+            signal_bar = exit_signal
+        return trades, equity
+
+    def tradeLog(self, trades):
+        columns = list(zip(*trades)) if trades else [()] * 8
+        size, entry_bar, exit_bar = (np.array(column, dtype = int) for column in columns[:3])
+        entry_price, exit_price, sl, tp, pnl = (np.array(column, dtype = float) for column in columns[3:])
+        entry_time, exit_time = self.data.index[entry_bar], self.data.index[exit_bar]
+        return pd.DataFrame({
+            'Size': size, 'EntryBar': entry_bar, 'ExitBar': exit_bar, 'EntryPrice': entry_price,
+            'ExitPrice': exit_price, 'SL': sl, 'TP': tp, 'PnL': pnl,
+            'ReturnPct': np.sign(size) * (exit_price / entry_price - 1),
+            'EntryTime': entry_time, 'ExitTime': exit_time, 'Duration': exit_time - entry_time
+        })
+
+    def summary(self, trades, equity):
+        # Scalar statistics only, cheap enough to compute for every optimizer run
+        pnl = np.array([trade[7] for trade in trades], dtype = float)
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            drawdown = 1 - equity / np.maximum.accumulate(equity)
+        return {
+            "Start": self.data.index[0],
+            "End": self.data.index[-1],
+            "Equity Final [$]": equity[-1],
+            "Equity Peak [$]": equity.max(),
+            "Return [%]": (equity[-1] - equity[0]) / equity[0] * 100,
+            "Max. Drawdown [%]": -np.nan_to_num(np.nanmax(drawdown, initial = 0)) * 100,
+            "# Trades": len(trades),
+            "Win Rate [%]": (pnl > 0).mean() * 100 if len(trades) else np.nan
+        }
+
+    def stats(self, trades, equity, params, summary = None):
+        return pd.Series({
+            **(summary or self.summary(trades, equity)),
+            "_strategy": StrategyParams(self.strategy.__name__, params, self.defaults()),
+            "_equity_curve": pd.DataFrame({"Equity": equity}, index = self.data.index),
+            "_trades": self.tradeLog(trades)
+        })
+
+    def _simulate(self, params):
+        strategy_params = self.params(params)
+        with np.errstate(invalid = 'ignore'):
+            signals = self.strategy.vectorSignals(self.data, strategy_params)
+        return self.simulate(signals, 1 + signals.warmup())
+
+    def run(self, **params):
+        trades, equity = self._simulate(params)
+        return self.stats(trades, equity, params)
+
+    def summarize(self, **params):
+        return self.summary(*self._simulate(params))
+
+    def optimize(self, maximize = 'Equity Final [$]', constraint = None, method = 'grid', max_tries = None,
+                 random_state = None, return_heatmap = False, **params):
+        # Exhaustive grid search, or a random sample of max_tries combinations when the grid is larger
+        if method != 'grid':
+            raise Exception("Unsupported Method\n Following are the Methods: grid")
+        grid = parameterGrid(params, constraint, max_tries or self.MAX_TRIES, random_state)
+        best, best_value = None, -np.inf
+        values = []
+        for combination in grid:
+            trades, equity = self._simulate(combination)
+            summary = self.summary(trades, equity)
+            value = summary[maximize]
+            values.append(value)
+            if best is None or (not np.isnan(value) and value > best_value):
+                best, best_value = (trades, equity, combination, summary), (-np.inf if np.isnan(value) else value)
+        # Only the winning run is turned into full stats with its trade log and equity curve
+        stats = self.stats(*best)
+        if not return_heatmap:
+            return stats
+        # Same shape as backtesting.py's heatmap: the objective of every tested combination, indexed by the params
+        index = pd.MultiIndex.from_tuples([tuple(combination.values()) for combination in grid], names = list(params))
+        return stats, pd.Series(values, index = index, name = maximize)
@@ -1,30 +1,70 @@
+import os
 import json
-import pandas as pd
-from backtesting import Backtest
+import asyncio
+from typing import Optional
 from fastapi import FastAPI, Response, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 
-from Prediction import PREDICTORS
+from Jobs import JobManager
+from Prediction import PREDICTORS, runPrediction
 from Screener import StockScreener
-from DataManagement import NewsScraper, StockScraper
-from ImageAnalysis import MovementClassifier, PatternClassifier
-from Strategies import STRATEGIES, STRATEGY_OPTIMIZATION, prepareData
+from DataManagement import BatchStockScraper, FrameEncoder, NewsScraper, StockScraper
+from ImageAnalysis import runClassifier
+from Strategies import (ENGINES, EQUITY_POINTS, OPTIMIZATION_MODES, RESULT_FORMATS, SCAN_BARS, STRATEGIES,
+                        STRATEGY_OPTIMIZATION, runBacktest, runScanner, runWalkForward)
 
 app = FastAPI()
+jobs = JobManager()
+
+@app.on_event("startup")
+def startKlineStreams():
+    symbols = [symbol for symbol in os.environ.get("KLINE_STREAM_SYMBOLS", "").split(",") if symbol]
+    if symbols:
+        intervals = os.environ.get("KLINE_STREAM_INTERVALS", "1min").split(",")
+        StockScraper.startStreaming(symbols, intervals)
+
+@app.on_event("shutdown")
+def stopKlineStreams():
+    StockScraper.stopStreaming()
+
+@app.on_event("shutdown")
+def stopJobs():
+    jobs.shutdown()
+
+@app.on_event("shutdown")
+async def closeBrowserPool():
+    await NewsScraper.BROWSER_POOL.close()
 
 @app.get("/get-ticker-data")
-def getStockData(ticker: str, interval: str, api: str):
+def getStockData(ticker: str, interval: str, api: str, format: str = "json"):
     try:
         scraper = StockScraper(ticker=ticker, interval=interval, api=api)
-        return scraper.getData()
+        if format == "json":
+            return scraper.getData()
+        content, media_type = FrameEncoder(scraper.getFrame()).encode(format)
+        return Response(content=content, media_type=media_type)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/get-batch-ticker-data")
+def getBatchStockData(tickers: str, interval: str, api: str, stream: bool = False):
+    try:
+        scraper = BatchStockScraper(tickers=tickers.split(","), interval=interval, api=api)
+        if stream:
+            records = (json.dumps(record, allow_nan=False) + "\n" for record in scraper.iterRecords())
+            return StreamingResponse(records, media_type="application/x-ndjson")
+        return Response(content=json.dumps(scraper.getData(), allow_nan=False), media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/get-news-data")
-def getNewsData(news_type: str):
+async def getNewsData(news_type: str, since: Optional[int] = None, limit: Optional[int] = None):
     try:
         scraper = NewsScraper(news_type=news_type)
-        scraper.scrapePages()
-        scraper.parsePages()
+        await scraper.scrapePagesAsync()
+        await asyncio.to_thread(scraper.parsePages)
+        if since is not None:
+            return await asyncio.to_thread(scraper.getNewData, since, limit)
         return scraper.getData()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -38,64 +78,121 @@ def getStockScreener(screener_type: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/stock-prediction")
-def getStockPrediction(predictor: str, ticker: str, interval: str, api: str, days_ahead: int):
+async def getStockPrediction(predictor: str, ticker: str, interval: str, api: str, days_ahead: int,
+                             use_cache: bool = True, run_async: bool = False):
+    if predictor not in PREDICTORS:
+        raise HTTPException(status_code=404, detail="Predictor not found")
     try:
-        if predictor not in PREDICTORS:
-            raise HTTPException(status_code=404, detail="Predictor not found")
-        model = PREDICTORS[predictor](ticker=ticker, interval=interval, api=api, days_ahead=days_ahead)
-        model.train()
-        model.forecast()
-        return model.getData()
+        args = (predictor, ticker, interval, api, days_ahead, use_cache)
+        if run_async:
+            return jobs.submit("stock-prediction", runPrediction, *args)
+        return await jobs.run("stock-prediction", runPrediction, *args)
     except Exception as e:
-        raise HTTPException(stattus_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/backtest")
-def getBacktestResults(ticker: str, interval: str, api: str, s_name: str):
+async def getBacktestResults(ticker: str, interval: str, api: str, s_name: str, engine: str = "backtesting",
+                             optimize: str = "separate", use_cache: bool = True, format: str = "json",
+                             points: int = EQUITY_POINTS, max_evals: Optional[int] = None,
+                             max_seconds: Optional[float] = None, run_async: bool = False):
+    if (s_name not in STRATEGIES) or (s_name not in STRATEGY_OPTIMIZATION):
+        raise HTTPException(status_code=404, detail="Strategy not found")
+    if engine not in ENGINES:
+        raise HTTPException(status_code=404, detail="Engine not found")
+    if optimize not in OPTIMIZATION_MODES:
+        raise HTTPException(status_code=404, detail="Optimization mode not found")
+    if format not in RESULT_FORMATS:
+        raise HTTPException(status_code=404, detail="Result format not found")
+    if points < 0:
+        raise HTTPException(status_code=400, detail="points must be 0 or more")
     try:
-        if (s_name not in STRATEGIES) or (s_name not in STRATEGY_OPTIMIZATION):
-            raise HTTPException(status_code=404, detail="Strategy not found")
-        s_class = STRATEGIES[s_name]
-        optimization_params = STRATEGY_OPTIMIZATION[s_name]
-        scraper = StockScraper(ticker=ticker, interval=interval, api=api)
-        df = pd.DataFrame(scraper.getData())
-        df = df.rename_axis('Date')
-        df.dropna(inplace=True)
-        bt = Backtest(df, s_class, cash=10000000)
-    
-        results_best_returns = bt.optimize(
-            **optimization_params["params"],
-            maximize='Equity Final [$]',
-            constraint=optimization_params.get("constraint", None),
-            method='skopt')
-        
-        results_best_winrate = bt.optimize(
-            **optimization_params["params"],
-            maximize='Win Rate [%]',
-            constraint=optimization_params.get("constraint", None),
-            method='skopt')
-        return prepareData(results_best_returns, results_best_winrate)
+        args = (ticker, interval, api, s_name, engine, optimize, use_cache, format, points, max_evals, max_seconds)
+        if run_async:
+            return jobs.submit("backtest", runBacktest, *args)
+        results = await jobs.run("backtest", runBacktest, *args)
+        if format == "columnar":
+            return Response(content=json.dumps(results, allow_nan=False), media_type="application/json")
+        return results
     except Exception as e:
-        raise HTTPException(stattus_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/image-analysis/movement-classify")
-def movementClassify(ticker: str, interval: str, api: str):
+@app.get("/walk-forward")
+async def getWalkForwardResults(tickers: str, interval: str, api: str, strategies: Optional[str] = None,
+                                engine: str = "backtesting", folds: int = 4, train_fraction: float = 0.7,
+                                run_async: bool = False):
+    ticker_list = [ticker.strip() for ticker in tickers.split(",") if ticker.strip()]
+    s_names = [s_name.strip() for s_name in strategies.split(",") if s_name.strip()] if strategies else list(STRATEGIES)
+    if any((s_name not in STRATEGIES) or (s_name not in STRATEGY_OPTIMIZATION) for s_name in s_names):
+        raise HTTPException(status_code=404, detail="Strategy not found")
+    if engine not in ENGINES:
+        raise HTTPException(status_code=404, detail="Engine not found")
     try:
-        model = MovementClassifier(ticker = ticker, interval = interval, api = api)
-        model.train()
-        model.classify()
-        return Response(content=model.getContent(), media_type="image/png")
+        args = (ticker_list, interval, api, s_names, engine, folds, train_fraction)
+        if run_async:
+            return jobs.submit("walk-forward", runWalkForward, *args)
+        return await jobs.run("walk-forward", runWalkForward, *args)
     except Exception as e:
-        raise HTTPException(stattus_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/image-analysis/pattern-classify")
-def patternClassify(ticker: str, interval: str, api: str):
+@app.get("/scanner")
+async def getScannerSignals(tickers: str, interval: str, api: str, strategies: Optional[str] = None,
+                            params: Optional[str] = None, bars: int = SCAN_BARS, run_async: bool = False):
+    ticker_list = [ticker.strip() for ticker in tickers.split(",") if ticker.strip()]
+    s_names = [s_name.strip() for s_name in strategies.split(",") if s_name.strip()] if strategies else list(STRATEGIES)
+    if any(s_name not in STRATEGIES for s_name in s_names):
+        raise HTTPException(status_code=404, detail="Strategy not found")
     try:
-        model = PatternClassifier(ticker = ticker, interval = interval, api = api)
-        model.train()
-        model.classify()
-        return Response(content=model.getContent(), media_type="image/png")
+        strategy_params = json.loads(params) if params else {}
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"params is not valid JSON: {e}")
+    if not isinstance(strategy_params, dict):
+        raise HTTPException(status_code=400, detail="params must be a JSON object of strategy name to parameters")
+    try:
+        if run_async:
+            return jobs.submit("scanner", runScanner, ticker_list, interval, api, s_names, strategy_params, bars)
+        return await jobs.run("scanner", runScanner, ticker_list, interval, api, s_names, strategy_params, bars)
     except Exception as e:
-        raise HTTPException(stattus_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def classify(classifier, ticker, interval, api, run_async):
+    try:
+        if run_async:
+            return jobs.submit(f"image-analysis/{classifier}-classify", runClassifier, classifier, ticker, interval, api,
+                               media_type="image/png")
+        content = await jobs.run(f"image-analysis/{classifier}-classify", runClassifier, classifier, ticker, interval, api)
+        return Response(content=content, media_type="image/png")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/image-analysis/movement-classify")
+async def movementClassify(ticker: str, interval: str, api: str, run_async: bool = False):
+    return await classify("movement", ticker, interval, api, run_async)
+
+@app.get("/image-analysis/pattern-classify")
+async def patternClassify(ticker: str, interval: str, api: str, run_async: bool = False):
+    return await classify("pattern", ticker, interval, api, run_async)
+
+@app.get("/jobs/{job_id}")
+def getJobStatus(job_id: str):
+    try:
+        return jobs.status(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+@app.get("/jobs/{job_id}/result")
+def getJobResult(job_id: str):
+    try:
+        status = jobs.status(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if status["status"] in ("queued", "running"):
+        return JSONResponse(status_code=202, content=status)
+    if status["status"] == "failed":
+        raise HTTPException(status_code=500, detail=status["error"])
+    result, media_type = jobs.result(job_id)
+    if media_type != "application/json":
+        return Response(content=result, media_type=media_type)
+    return result
 
 if __name__ == "__main__":
     import uvicorn